@@ -5,8 +5,12 @@ import warnings
 
 warnings.simplefilter("ignore")  # Ignore all warnings
 
+import io
+import json
 import uuid
+import shutil
 import time
+import tempfile
 import traceback
 import threading
 from pathlib import Path
@@ -15,6 +19,8 @@ from collections import defaultdict
 
 from flask_cors import CORS
 from flask import Flask, request, send_file, jsonify, Response
+from werkzeug.wsgi import get_input_stream
+from werkzeug.wrappers import Response as WSGIResponse
 
 import matplotlib
 
@@ -27,6 +33,17 @@ if backend_dir not in sys.path:
 
 from src.seeds import *
 from src.pdf.constructor import PDF_Constructor
+from src.parser.archive import ZIP_ERRORS, check_zip, is_zip, open_zip
+from src.parser.compressed import (
+    DECOMPRESS_ERRORS,
+    EXTENSIONS,
+    compression,
+    decompressing_reader,
+)
+from src.parser.columnar import to_frame, to_typed
+from src.parser.engine import read_stream, read_text_format
+import src.cache as chat_cache
+import src.uploads as uploads
 from src.db import init_db, save_pdf_generation, save_chat_analytics
 
 
@@ -35,6 +52,8 @@ SERVER_START_TIME = datetime.now()
 TEMP_DIR = "/tmp" if os.getenv("RENDER") else str(Path(__file__).parent.parent / "temp")
 PDF_DIR = "/tmp" if os.getenv("RENDER") else str(Path(__file__).parent.parent / "pdfs")
 
+PRESCAN_SIZE = 64 * 1024  # Bytes of an upload checked before queuing it
+
 os.makedirs(TEMP_DIR, exist_ok=True)
 os.makedirs(PDF_DIR, exist_ok=True)
 
@@ -50,13 +69,41 @@ CORS(
                 "http://localhost:8080",
                 "http://whatsapp-wrapped.it",
             ],
-            "methods": ["GET", "POST", "OPTIONS"],
-            "allow_headers": ["Content-Type"],
+            "methods": ["GET", "POST", "PUT", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Content-Encoding"],
             "expose_headers": ["Content-Disposition", "Content-Type", "X-Request-ID"],
         }
     },
 )
 
+
+
+class DecompressRequest:
+    """WSGI middleware decompressing request bodies sent with Content-Encoding gzip (or zstd) while they are read."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get("HTTP_CONTENT_ENCODING", "identity").strip().lower()
+        if encoding != "identity":
+            try:
+                body = decompressing_reader(get_input_stream(environ), encoding)
+            except ValueError as e:
+                response = WSGIResponse(
+                    json.dumps({"error": str(e)}), status=415, mimetype="application/json"
+                )
+                return response(environ, start_response)
+            # The decompressed length is unknown: read the body until its end
+            environ["wsgi.input"] = body
+            environ["wsgi.input_terminated"] = True
+            environ.pop("CONTENT_LENGTH", None)
+            del environ["HTTP_CONTENT_ENCODING"]
+        return self.wsgi_app(environ, start_response)
+
+
+app.wsgi_app = DecompressRequest(app.wsgi_app)
+
 # Database setup
 init_db()
 
@@ -85,20 +132,142 @@ def monitor_progress(request_id: str, pdf: PDF_Constructor) -> None:
         )
 
 
-def generate_pdf(request_id: str, file_path: str, lang: str) -> None:
-    """Background thread to generate the PDF
+def open_chat(stream, filename: str) -> tuple:
+    """Return the chat text of an upload as a binary stream
+
+    Archives and compressed exports are decompressed while the returned
+    stream is read, so their inflated text is never written to disk.
+
+    :param stream: seekable binary file object with the upload
+    :param filename: name of the uploaded file
+    :return: tuple with the binary file object of the chat text (stream itself
+        for text uploads), the name of the chat file and the number of media
+        files (None if unknown)
+    """
+    if is_zip(stream):
+        return open_zip(stream)
+    encoding = compression(stream)
+    if encoding is not None:
+        name, ext = os.path.splitext(filename)
+        reader = decompressing_reader(stream, encoding)
+        return reader, name if ext.lower() in EXTENSIONS else filename, None
+    return stream, filename, None
+
+
+def read_seekable(text, media_count: int) -> tuple:
+    """Parse a seekable chat text, or take it from the cache if the same chat was seen
+
+    :param text: seekable binary file object with the chat text
+    :param media_count: number of media files of the upload, None if unknown
+    :return: tuple with the parsed chat, the number of media files, the cache key
+        and the cache metadata (both None on a cache hit)
+    """
+    # The same chat is often uploaded again (retries, other language, zipped)
+    cache_key = chat_cache.content_hash(text)
+    cached = chat_cache.get(cache_key)
+    if cached is not None:
+        df, meta = cached
+        if media_count is None:
+            media_count = meta["media_count"]
+        return df, media_count, None, None
+    # A new export of a cached chat only needs its new messages parsed
+    cache_meta = chat_cache.prefix_meta(text)
+    df = chat_cache.get_extended(text, cache_meta)
+    if df is None:
+        # Parsed from the upload's own spooled file: nothing is saved
+        # under the client's file name, so equal names can't collide
+        df = to_frame(to_typed(read_stream(text)))
+    return df, media_count, cache_key, cache_meta
+
+
+def read_once(raw, media_count: int) -> tuple:
+    """Parse a chat text that can only be read once, hashing it while it is parsed
+
+    Only chats starting like a cached one are spooled to a temporary file,
+    since the cache has to seek through them; the others never hit the cache.
+
+    :param raw: binary file object with the chat text, e.g. a decompressing reader
+    :param media_count: number of media files of the upload, None if unknown
+    :return: tuple with the parsed chat, the number of media files, the cache key
+        and the cache metadata (both None on a cache hit)
+    """
+    head = chat_cache.read_head(raw)
+    if len(head) < chat_cache.HEAD_SIZE:  # Already read whole
+        return read_seekable(io.BytesIO(head), media_count)
+    if chat_cache.has_head(head):
+        with tempfile.TemporaryFile(dir=TEMP_DIR) as text:
+            text.write(head)
+            shutil.copyfileobj(raw, text, chat_cache.CHUNK_SIZE)
+            text.seek(0)
+            return read_seekable(text, media_count)
+    reader = chat_cache.HashingReader(raw, head)
+    with io.TextIOWrapper(io.BufferedReader(reader), encoding="utf8") as fp:
+        columns, fmt = read_text_format(fp)
+    df = to_frame(to_typed(columns))
+    return df, media_count, reader.content_hash(), reader.prefix_meta(fmt.name)
+
+
+def read_upload(stream, filename: str) -> tuple:
+    """Parse an uploaded chat, or take it from the cache if the same chat was seen
+
+    :param stream: seekable binary file object with the upload
+    :param filename: name of the uploaded file
+    :return: tuple with the chat file path (only its name is used), the parsed chat,
+        the number of media files, the cache key and the cache metadata (see prefix_meta)
+    """
+    text, name, media_count = open_chat(stream, filename)
+    file_path = os.path.join(TEMP_DIR, name)
+    try:
+        if text is stream:
+            return (file_path,) + read_seekable(text, media_count)
+        try:
+            return (file_path,) + read_once(text, media_count)
+        except DECOMPRESS_ERRORS + ZIP_ERRORS as e:
+            raise ValueError(f"Couldn't decompress {filename}: {e}") from e
+    finally:
+        if text is not stream:
+            text.close()
+
+
+def generate_pdf(
+    request_id: str, stream, filename: str, lang: str, upload_id: str = None
+) -> None:
+    """Background thread to parse the chat and generate the PDF
     :param request_id: the id of the request
-    :param file_path: the path of the file to generate the PDF from
+    :param stream: seekable binary file object with the upload, closed when the job ends
+    :param filename: the name of the uploaded file
     :param lang: the language of the PDF
+    :param upload_id: the resumable upload the stream was opened from, deleted when the job ends
     """
     print(
-        f"[{request_id}] Starting PDF generation for file: {os.path.basename(file_path)}, language: {lang}"
+        f"[{request_id}] Starting PDF generation for file: {os.path.basename(filename)}, language: {lang}"
     )
     start_time = time.time()
     try:
+        pdf_progress[request_id]["status"] = "parsing"
+        file_path, df, media_count, cache_key, cache_meta = read_upload(
+            stream, filename
+        )
+        print(
+            f"[{request_id}] Parsed {len(df)} messages in "
+            f"{time.time() - start_time:.1f}s"
+        )
         pdf_progress[request_id]["status"] = "generating"
 
-        pdf = PDF_Constructor(file_path, lang=lang)
+        pdf = PDF_Constructor(file_path, lang=lang, df=df, media_count=media_count)
+        memory = pdf.memory_usage()
+        print(
+            f"[{request_id}] Chat memory: {memory['total'] / 1024 / 1024:.1f} MB, "
+            f"{memory['per_message']} bytes per message"
+        )
+
+        if cache_key is not None:
+            try:
+                chat_cache.put(
+                    cache_key, pdf.df, {**(cache_meta or {}), "media_count": media_count}
+                )
+            except Exception as cache_err:
+                print(f"[{request_id}] Chat cache error: {str(cache_err)}")
 
         # Start progress monitoring in a separate thread
         monitor_thread = threading.Thread(
@@ -108,6 +277,7 @@ def generate_pdf(request_id: str, file_path: str, lang: str) -> None:
 
         # Actual PDF generation steps
         seed1(pdf)
+        print(f"[{request_id}] Seed metrics: {pdf.stats.timing_report()}")
 
         print(f"[{request_id}] PDF processing complete, finalizing")
         pdf_progress[request_id]["status"] = "finalizing"
@@ -154,9 +324,57 @@ def generate_pdf(request_id: str, file_path: str, lang: str) -> None:
                 f"[{request_id}] Status save error: {str(status_err)}\n{traceback.format_exc()}"
             )
     finally:
-        # Cleanup input file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        stream.close()
+        if upload_id is not None:
+            uploads.remove(upload_id)
+
+
+def start_generation(
+    stream, filename: str, lang: str, upload_id: str = None
+) -> Response:
+    """Check an uploaded chat and start parsing it and generating its PDF in a background thread
+
+    Only the first bytes are read here: hashing, decompressing and parsing
+    are done by the job, so big uploads don't hold the request.
+
+    :param stream: seekable binary file object with the upload, owned (and closed) from now on
+    :param filename: name of the uploaded file
+    :param lang: the language of the PDF
+    :param upload_id: the resumable upload the stream was opened from, deleted by the job
+    :return: JSON response with request ID and status
+    """
+    try:
+        head = stream.read(PRESCAN_SIZE)
+        stream.seek(0)
+        if not head:
+            raise ValueError("The chat is empty")
+        uploads.prescan(head)
+        if is_zip(stream):
+            check_zip(stream)  # Only its central directory is read
+    except ValueError as e:
+        stream.close()
+        return jsonify({"error": str(e)}), 400
+
+    request_id = str(uuid.uuid4())
+
+    pdf_progress[request_id] = {
+        "progress": 0,
+        "status": "starting",
+        "pdf_path": None,
+    }
+
+    # Start PDF generation in background thread
+    thread = threading.Thread(
+        target=generate_pdf,
+        args=(request_id, stream, filename, lang, upload_id),
+        daemon=True,
+    )
+    thread.start()
+
+    # Return the request ID to identify the request
+    response = jsonify({"request_id": request_id, "status": "processing"})
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 
 @app.post("/generate")
@@ -172,29 +390,84 @@ def generate() -> Response:
 
         f = request.files["chat"]
         lang = request.form.get("lang", "en")
+        # The request closes its files when it ends, the job keeps reading the spool
+        stream, f.stream = f.stream, io.BytesIO()
+        return start_generation(stream, f.filename, lang)
 
-        request_id = str(uuid.uuid4())
+    except Exception as e:
+        return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
 
-        pdf_progress[request_id] = {
-            "progress": 0,
-            "status": "starting",
-            "pdf_path": None,
-        }
 
-        tmp_path = os.path.join(TEMP_DIR, f.filename)
-        f.save(tmp_path)
+@app.post("/upload")
+def create_upload() -> Response:
+    """Start a resumable chunked upload, for exports too big for a single request
 
-        # Start PDF generation in background thread
-        thread = threading.Thread(
-            target=generate_pdf, args=(request_id, tmp_path, lang), daemon=True
-        )
-        thread.start()
+    Expects a JSON body with the filename and, if known, the total size.
+
+    :return: JSON response with the upload id and the offset of the next chunk"""
+    data = request.get_json(silent=True) or {}
+    if not data.get("filename"):
+        return jsonify({"error": "No filename provided"}), 400
+    try:
+        size = int(data["size"]) if data.get("size") is not None else None
+        return jsonify(uploads.create(data["filename"], size))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.get("/upload/<upload_id>")
+def get_upload(upload_id: str) -> Response:
+    """Get how much of an upload was received, to resume it
 
-        # Return the request ID to identify the request
-        response = jsonify({"request_id": request_id, "status": "processing"})
-        response.headers["X-Request-ID"] = request_id
-        return response
+    :param upload_id: the id of the upload
+    :return: JSON response with the offset of the next chunk"""
+    try:
+        return jsonify(uploads.status(upload_id))
+    except KeyError:
+        return jsonify({"error": "Upload not found"}), 404
+
+
+@app.put("/upload/<upload_id>")
+def put_chunk(upload_id: str) -> Response:
+    """Store the chunk in the request body at the position given by the offset parameter
 
+    :param upload_id: the id of the upload
+    :return: JSON response with the offset of the next chunk"""
+    offset = request.args.get("offset", type=int)
+    if offset is None:
+        return jsonify({"error": "No offset provided"}), 400
+    try:
+        received = uploads.status(upload_id)["offset"]
+        if offset > received:
+            return jsonify({"error": "Missing chunk", "offset": received}), 409
+        received = uploads.write_chunk(upload_id, offset, request.get_data(cache=False))
+        return jsonify({"upload_id": upload_id, "offset": received})
+    except KeyError:
+        return jsonify({"error": "Upload not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.post("/upload/<upload_id>/finalize")
+def finalize_upload(upload_id: str) -> Response:
+    """Generate the PDF of a completely received upload
+
+    :param upload_id: the id of the upload
+    :return: JSON response with request ID and status"""
+    try:
+        status = uploads.status(upload_id)
+    except KeyError:
+        return jsonify({"error": "Upload not found"}), 404
+    if status["size"] is not None and status["offset"] != status["size"]:
+        return jsonify({"error": "Upload not complete", "offset": status["offset"]}), 409
+    if status["offset"] == 0:
+        return jsonify({"error": "Upload is empty"}), 400
+
+    data = request.get_json(silent=True) or {}
+    lang = data.get("lang", request.form.get("lang", "en"))
+    try:
+        fp = open(uploads.part_path(upload_id), "rb")
+        return start_generation(fp, status["filename"], lang, upload_id)
     except Exception as e:
         return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
 
@@ -260,6 +533,7 @@ def health() -> Response:
             "status": "ok" if temp_ok and pdf_ok else "error",
             "environment": os.getenv("FLASK_ENV", "development"),
             "server_uptime": str(datetime.now() - SERVER_START_TIME),
+            "chat_cache": chat_cache.stats(),
         }
     )
 
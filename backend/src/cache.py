@@ -0,0 +1,337 @@
+"""Content-hash keyed on-disk cache of parsed chats."""
+
+import io
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from src.parser.formats import SNIFF_LINES, get_format, sniff
+from src.parser.columnar import FRAME_COLUMNS, append_tail, compact_frame
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_ARROW = True
+except Exception:
+    HAS_ARROW = False
+
+
+# Parsed chats are stored as Feather (Arrow IPC) files, pickles without pyarrow
+CACHE_DIR = os.getenv(
+    "CHAT_CACHE_DIR",
+    "/tmp/chat_cache"
+    if os.getenv("RENDER")
+    else str(Path(__file__).resolve().parent.parent / "cache"),
+)
+CACHE_MAX_BYTES = int(os.getenv("CHAT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", 24 * 60 * 60))  # Seconds since last use
+DATA_EXT = ".feather" if HAS_ARROW else ".pkl"
+HEAD_SIZE = 4096  # Bytes hashed to find the previous exports of a chat
+CHUNK_SIZE = 1024 * 1024
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "prefix_hits": 0, "stores": 0, "evictions": 0}
+
+
+def content_hash(stream, chunk_size: int = CHUNK_SIZE) -> str:
+    """Return the hash of an uploaded file, leaving the stream where it was.
+
+    :param stream: seekable binary file object
+    :param chunk_size: bytes read at a time
+    :return: hex digest identifying the content"""
+    pos = stream.tell()
+    digest = hashlib.blake2b(digest_size=20)
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+    stream.seek(pos)
+    return digest.hexdigest()
+
+
+def _paths(key: str) -> tuple:
+    """Return the data and metadata paths of a cache entry."""
+    base = os.path.join(CACHE_DIR, key)
+    return base + DATA_EXT, base + ".json"
+
+
+def _remove(key: str) -> None:
+    """Delete a cache entry, ignoring missing files."""
+    for file_path in _paths(key):
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+
+def _load(key: str):
+    """Read a cache entry, None if it is missing, expired or in an older layout."""
+    data_path, meta_path = _paths(key)
+    try:
+        if time.time() - os.path.getmtime(data_path) > CACHE_TTL:
+            _remove(key)
+            return None
+        with open(meta_path, "r") as fp:
+            meta = json.load(fp)
+        df = pd.read_feather(data_path) if HAS_ARROW else pd.read_pickle(data_path)
+        if list(df.columns) != FRAME_COLUMNS:  # Stored before the compact layout
+            _remove(key)
+            return None
+        os.utime(data_path)  # Last use, for LRU eviction and TTL
+    except (OSError, ValueError):
+        return None
+    return compact_frame(df), meta
+
+
+def get(key: str):
+    """Return a cached parsed chat.
+
+    :param key: content hash of the upload
+    :return: tuple with the chat DataFrame and its metadata, None on a miss"""
+    cached = _load(key)
+    with _lock:
+        _stats["hits" if cached is not None else "misses"] += 1
+    return cached
+
+
+def _head_hash(head: bytes) -> str:
+    """Return the hash of the first HEAD_SIZE bytes of a chat."""
+    return hashlib.blake2b(head[:HEAD_SIZE], digest_size=20).hexdigest()
+
+
+def _meta(head: bytes, size: int, newline_end: bool, fmt_name: str = None) -> dict:
+    """Return the prefix metadata of a chat from its first bytes, size and last byte."""
+    if size < HEAD_SIZE:
+        return {}
+    meta = {"size": size, "head": _head_hash(head)}
+    # Only exports ending with a complete line can be extended by a later one
+    if newline_end and fmt_name is not None:
+        meta["format"] = fmt_name
+    return meta
+
+
+def prefix_meta(stream) -> dict:
+    """Return what is needed to recognize a text upload as the start of a later export.
+
+    :param stream: seekable binary file object with the chat text
+    :return: dictionary with size and head hash, plus the chat format if the
+        upload can be extended; empty for uploads shorter than HEAD_SIZE"""
+    pos = stream.tell()
+    sample = [stream.readline() for _ in range(SNIFF_LINES)]
+    stream.seek(pos)
+    head = stream.read(HEAD_SIZE)
+    size = stream.seek(0, io.SEEK_END) - pos
+    if size < HEAD_SIZE:  # Also covers empty uploads, before seeking to their last byte
+        stream.seek(pos)
+        return {}
+    stream.seek(pos + size - 1)
+    newline_end = stream.read(1) == b"\n"
+    stream.seek(pos)
+    try:
+        fmt_name = sniff([line.decode("utf8", "ignore") for line in sample]).name
+    except ValueError:
+        fmt_name = None
+    return _meta(head, size, newline_end, fmt_name)
+
+
+class HashingReader(io.RawIOBase):
+    """Binary reader hashing a stream while it is read, for chats that can't be read twice.
+
+    The hash is the content_hash of the bytes read, and prefix_meta the
+    metadata prefix_meta would give, so decompressed uploads share the
+    cache entries of their plain text without being spooled to disk."""
+
+    def __init__(self, raw, head: bytes = b""):
+        """
+        :param raw: binary file object, e.g. a decompressing reader
+        :param head: bytes already read from raw, returned first
+        """
+        super().__init__()
+        self.raw = raw
+        self.size = 0
+        self.head = b""
+        self._pending = head
+        self._last = b""
+        self._digest = hashlib.blake2b(digest_size=20)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        if self._pending:
+            data, self._pending = self._pending[: len(buf)], self._pending[len(buf) :]
+        else:
+            data = self.raw.read(len(buf))
+        n = len(data)
+        if n:
+            buf[:n] = data
+            self._digest.update(data)
+            self.size += n
+            if len(self.head) < HEAD_SIZE:
+                self.head += data[: HEAD_SIZE - len(self.head)]
+            self._last = data[-1:]
+        return n
+
+    def content_hash(self) -> str:
+        """Return the content_hash of the bytes read so far."""
+        return self._digest.hexdigest()
+
+    def prefix_meta(self, fmt_name: str) -> dict:
+        """Return the prefix_meta of the bytes read so far.
+
+        :param fmt_name: format the chat was parsed with
+        :return: dictionary with size, head hash and chat format, see prefix_meta"""
+        return _meta(self.head, self.size, self._last == b"\n", fmt_name)
+
+
+def read_head(raw) -> bytes:
+    """Return the first HEAD_SIZE bytes of a binary reader, fewer only at its end."""
+    head = b""
+    while len(head) < HEAD_SIZE:
+        chunk = raw.read(HEAD_SIZE - len(head))
+        if not chunk:
+            break
+        head += chunk
+    return head
+
+
+def has_head(head: bytes) -> bool:
+    """Return whether a cached chat starts with the same HEAD_SIZE bytes.
+
+    Only then can an upload be a cached chat or extend one, so the others
+    can be parsed while they are read, without seeking back.
+
+    :param head: first HEAD_SIZE bytes of the upload
+    :return: True if a cache entry has the same head hash"""
+    if len(head) < HEAD_SIZE:
+        return False
+    digest = _head_hash(head)
+    return any(meta.get("head") == digest for _, meta in _metas())
+
+
+def _metas():
+    """Yield key and metadata of every cache entry."""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for entry in os.scandir(CACHE_DIR):
+        if entry.name.endswith(".json"):
+            try:
+                with open(entry.path, "r") as fp:
+                    yield entry.name[: -len(".json")], json.load(fp)
+            except (OSError, ValueError):
+                continue
+
+
+def get_extended(stream, meta: dict):
+    """Return the cached chat of a previous export the upload starts with, plus the new messages.
+
+    Candidates share the head hash of the upload; the longest one whose
+    content hash matches the same number of leading bytes of the upload is
+    extended by parsing only the bytes after it.
+
+    :param stream: seekable binary file object with the chat text
+    :param meta: prefix_meta of the upload
+    :return: the chat DataFrame, None if no previous export matches"""
+    if not meta.get("format"):
+        return None
+    candidates = sorted(
+        (other["size"], key)
+        for key, other in _metas()
+        if other.get("head") == meta["head"]
+        and other.get("format") == meta["format"]
+        and other["size"] < meta["size"]
+    )
+    pos = stream.tell()
+    digest = hashlib.blake2b(digest_size=20)
+    read, best = 0, None
+    for size, key in candidates:
+        while read < size:
+            chunk = stream.read(min(CHUNK_SIZE, size - read))
+            if not chunk:
+                break
+            digest.update(chunk)
+            read += len(chunk)
+        if read == size and digest.hexdigest() == key:
+            best = (size, key)
+    cached = _load(best[1]) if best is not None else None
+    df = None
+    if cached is not None:
+        stream.seek(pos + best[0])
+        fp = io.TextIOWrapper(stream, encoding="utf8")
+        try:
+            df = append_tail(cached[0], fp, get_format(meta["format"]))
+        except ValueError:
+            df = None
+        finally:
+            fp.detach()
+    stream.seek(pos)
+    if df is not None:
+        with _lock:
+            _stats["prefix_hits"] += 1
+    return df
+
+
+def put(key: str, df: pd.DataFrame, meta: dict = None) -> None:
+    """Store a parsed chat and evict old entries to stay under CACHE_MAX_BYTES.
+
+    :param key: content hash of the upload
+    :param df: chat DataFrame
+    :param meta: JSON serializable details of the upload (e.g. the media count)"""
+    if CACHE_MAX_BYTES <= 0:
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    data_path, meta_path = _paths(key)
+    tmp_path = f"{data_path}.{threading.get_ident()}.tmp"
+    if HAS_ARROW:
+        df.to_feather(tmp_path)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, data_path)
+    with open(meta_path, "w") as fp:
+        json.dump(meta or {}, fp)
+    with _lock:
+        _stats["stores"] += 1
+    evict()
+
+
+def _entries() -> list:
+    """Return (last use, size, key) of every cache entry, least recently used first."""
+    entries = []
+    if not os.path.isdir(CACHE_DIR):
+        return entries
+    for entry in os.scandir(CACHE_DIR):
+        if entry.name.endswith(DATA_EXT):
+            info = entry.stat()
+            entries.append((info.st_mtime, info.st_size, entry.name[: -len(DATA_EXT)]))
+    return sorted(entries)
+
+
+def evict() -> None:
+    """Delete expired entries, then the least recently used ones until the cache fits."""
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    now = time.time()
+    for last_use, size, key in entries:
+        if total <= CACHE_MAX_BYTES and now - last_use <= CACHE_TTL:
+            continue
+        _remove(key)
+        total -= size
+        with _lock:
+            _stats["evictions"] += 1
+
+
+def stats() -> dict:
+    """Return hit rate and size of the cache.
+
+    :return: dictionary with counters, hit rate, entries and bytes used"""
+    entries = _entries()
+    with _lock:
+        out = dict(_stats)
+    lookups = out["hits"] + out["misses"]
+    out["hit_rate"] = round(out["hits"] / lookups, 3) if lookups else None
+    out["entries"] = len(entries)
+    out["bytes"] = sum(size for _, size, _ in entries)
+    return out
@@ -0,0 +1,114 @@
+"""Word lists (stopwords, blacklist, phrase lexicons) compiled into one file loaded once per process.
+
+The lexicon is built with ``python -m src.lexicon``, which is the only
+place NLTK (and its download) is used, and committed as lists/lexicon.json;
+rebuild it after editing a word list. Requests only read the frozensets and
+phrase lists below."""
+
+import os
+import json
+from pathlib import Path
+
+LISTS_DIR = Path(__file__).resolve().parent.parent / "lists"
+LEXICON_PATH = os.getenv("LEXICON_PATH", str(LISTS_DIR / "lexicon.json"))
+LEXICON_VERSION = 2  # Bump when the layout of the file changes
+STOPWORD_LANGUAGES = ("english", "italian")
+
+# Phrase lexicons counted by stats.phrases, one phrase per line. A trailing *
+# lets the last word go on (e.g. "ahah*" matches "ahahahah")
+PHRASE_LISTS = {
+    "swears": "parolacce.txt",
+    "laughs": "risate.txt",
+    "love": "amore.txt",
+    "greetings": "saluti.txt",
+}
+
+
+def read_list(filename: str) -> list:
+    """Return the words of a file in the lists folder, one per line."""
+    with open(LISTS_DIR / filename, "r", encoding="utf8") as fp:
+        return [line.strip() for line in fp if line.strip()]
+
+
+def read_phrases() -> dict:
+    """Return the phrases of every lexicon in PHRASE_LISTS, lowercased and sorted."""
+    return {
+        category: sorted({phrase.lower() for phrase in read_list(filename)})
+        for category, filename in PHRASE_LISTS.items()
+    }
+
+
+def compile_lexicon(download: bool = False) -> dict:
+    """Gather the word lists from NLTK and the lists folder.
+
+    :param download: download the NLTK stopwords if they aren't installed
+    :return: dictionary with version, stopwords per language, blacklist and phrases"""
+    import nltk
+    from nltk.corpus import stopwords
+
+    try:
+        nltk.data.find("corpora/stopwords")
+    except LookupError:
+        if not download:
+            raise
+        nltk.download("stopwords", quiet=True)
+    return {
+        "version": LEXICON_VERSION,
+        "stopwords": {lang: sorted(stopwords.words(lang)) for lang in STOPWORD_LANGUAGES},
+        "blacklist": sorted(set(read_list("blacklist.txt"))),
+        "phrases": read_phrases(),
+    }
+
+
+def build(path: str = LEXICON_PATH) -> dict:
+    """Compile the lexicon and write it to path.
+
+    :param path: where to write the lexicon
+    :return: the compiled lexicon"""
+    lexicon = compile_lexicon(download=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf8") as fp:
+        json.dump(lexicon, fp, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return lexicon
+
+
+def load(path: str = LEXICON_PATH) -> dict:
+    """Read the compiled lexicon.
+
+    The file is committed with the word lists, so a missing or outdated one
+    is a deploy error: stopwords silently missing would change every word count.
+
+    :param path: file written by build
+    :return: dictionary with version, stopwords per language, blacklist and phrases
+    :raises RuntimeError: if the file is missing, unreadable or outdated"""
+    try:
+        with open(path, "r", encoding="utf8") as fp:
+            lexicon = json.load(fp)
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"Can't read {path}, run python -m src.lexicon: {e}") from e
+    if lexicon.get("version") != LEXICON_VERSION:
+        raise RuntimeError(f"{path} is outdated, run python -m src.lexicon")
+    return lexicon
+
+
+def word_sets(lexicon: dict) -> tuple:
+    """Return the stopwords (blacklist included) and the swear words of a lexicon as frozensets."""
+    stop_words = set(lexicon["blacklist"])
+    for words in lexicon["stopwords"].values():
+        stop_words.update(words)
+    return frozenset(stop_words), frozenset(lexicon["phrases"]["swears"])
+
+
+if __name__ == "__main__":
+    lexicon = build()
+    stop_words, swear_words = word_sets(lexicon)
+    phrases = sum(len(phrases) for phrases in lexicon["phrases"].values())
+    print(
+        f"[LEXICON] Wrote {LEXICON_PATH}: {len(stop_words)} stopwords, "
+        f"{len(swear_words)} swear words, {phrases} phrases"
+    )
+else:
+    _lexicon = load()
+    STOP_WORDS, SWEAR_WORDS = word_sets(_lexicon)
+    PHRASES = _lexicon["phrases"]
@@ -0,0 +1,87 @@
+"""
+Ingestion of zipped WhatsApp exports.
+"""
+
+import zlib
+import zipfile
+from os import path
+
+CHAT_MEMBER = "_chat.txt"  # Name of the chat inside iOS exports
+ZIP_MAGIC = b"PK\x03\x04"
+# Raised while reading a corrupt or truncated archive
+ZIP_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError)
+
+
+def is_zip(stream) -> bool:
+    """Return whether a binary stream holds a zip archive, without moving it.
+
+    :param stream: seekable binary file object
+    :return: True if the stream starts with the zip signature"""
+    pos = stream.tell()
+    magic = stream.read(len(ZIP_MAGIC))
+    stream.seek(pos)
+    return magic == ZIP_MAGIC
+
+
+def find_chat_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+    """Return the chat text inside an exported archive.
+
+    iOS names it _chat.txt, Android after the chat ("Chat WhatsApp con ...txt").
+    Documents shared in the chat can be .txt files too, so the chat is the
+    member named like a WhatsApp export or, failing that, the biggest one.
+
+    :param archive: open zip archive
+    :return: info of the chat member, None if there is no text file"""
+    texts = [
+        i
+        for i in archive.infolist()
+        if not i.is_dir() and i.filename.lower().endswith(".txt")
+    ]
+    for info in texts:
+        if path.basename(info.filename) == CHAT_MEMBER:
+            return info
+    for info in texts:
+        if "whatsapp" in path.basename(info.filename).lower():
+            return info
+    return max(texts, key=lambda i: i.file_size, default=None)
+
+
+def check_zip(stream) -> None:
+    """Check that an archive can be opened and holds a chat, reading only its central directory.
+
+    :param stream: seekable binary file object with the zip archive, left where it was
+    :raises ValueError: if the archive is corrupt or has no chat"""
+    pos = stream.tell()
+    try:
+        with zipfile.ZipFile(stream) as archive:
+            if find_chat_member(archive) is None:
+                raise ValueError("No chat file found in the archive")
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Couldn't read the archive: {e}") from e
+    finally:
+        stream.seek(pos)
+
+
+def open_zip(stream) -> tuple:
+    """Open the chat inside an exported archive, decompressing only the chat member as it is read.
+
+    Media files are counted from the central directory and never decompressed.
+
+    :param stream: seekable binary file object with the zip archive, read until
+        the returned reader is closed
+    :return: tuple with a binary file object reading the chat text, the chat
+        member name and the number of media files
+    :raises ValueError: if the archive is corrupt or has no chat"""
+    try:
+        with zipfile.ZipFile(stream) as archive:
+            member = find_chat_member(archive)
+            if member is None:
+                raise ValueError("No chat file found in the archive")
+            media_count = sum(
+                1 for i in archive.infolist() if not i.is_dir() and i is not member
+            )
+            # The member keeps reading the stream after the archive is closed
+            raw = archive.open(member)
+    except ZIP_ERRORS as e:  # Corrupt or truncated
+        raise ValueError(f"Couldn't read the archive: {e}") from e
+    return raw, path.basename(member.filename), media_count
@@ -0,0 +1,167 @@
+"""
+Typed columnar output of the chat parser.
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from pandas.api.types import union_categoricals
+
+from src.parser.engine import parse_lines, read_columns
+from src.parser.formats import ChatFormat
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+EPOCH = date(1970, 1, 1).toordinal()
+
+# Columns of the chat DataFrame, see to_frame
+FRAME_COLUMNS = ["day", "seconds", "who", "message"]
+
+# Message texts share one Arrow buffer instead of a Python string object each
+MESSAGE_DTYPE = pd.StringDtype("pyarrow") if HAS_ARROW else object
+
+
+def epoch_day(txt: str) -> int:
+    """Return the number of days between the epoch and a dd/mm/yy (or dd/mm/yyyy) date.
+
+    :param txt: date as written in the chat
+    :return: days since 01/01/1970"""
+    day, month, year = map(int, txt.split("/"))
+    if year < 100:  # Two digit years are of this century, as in ChatFormat.split_date
+        year += 2000
+    if month > 12:  # Month-first date, swapped back like dayfirst parsing does
+        day, month = month, day
+    return date(year, month, day).toordinal() - EPOCH
+
+
+def day_seconds(txt: str) -> int:
+    """Return the seconds elapsed since midnight of a HH:MM:SS time.
+
+    :param txt: time as written in the chat
+    :return: seconds of the day"""
+    return int(txt[:2]) * 3600 + int(txt[3:5]) * 60 + int(txt[6:8])
+
+
+def _convert_distinct(values: list, func, dtype) -> np.ndarray:
+    """Apply func once per distinct value and broadcast the result to the whole column."""
+    codes, uniques = pd.factorize(np.array(values, dtype=object))
+    return np.array([func(i) for i in uniques], dtype=dtype)[codes]
+
+
+def to_typed(columns: dict) -> dict:
+    """Convert the parsed string columns to typed columns.
+
+    The parser normalizes dates and times of every chat format to a fixed
+    layout, so they are converted once per distinct value instead of being
+    inferred per message.
+
+    :param columns: dictionary with date, time, who, message lists
+    :return: dictionary with int32 epoch days, int32 seconds of the day,
+        categorical senders and message texts"""
+    return {
+        "date": _convert_distinct(columns["date"], epoch_day, np.int32),
+        "time": _convert_distinct(columns["time"], day_seconds, np.int32),
+        "who": pd.Categorical(columns["who"]),
+        "message": columns["message"],
+    }
+
+
+def to_frame(typed: dict) -> pd.DataFrame:
+    """Build the chat DataFrame used by PDF_Constructor from typed columns.
+
+    Dates and times stay fixed-width integers: 8 bytes per message instead
+    of 16 for datetime64 and timedelta64 columns. Stats convert them back to
+    dates only after aggregating (see stats.calendar.to_timestamp).
+
+    :param typed: dictionary returned by to_typed
+    :return: DataFrame with day (int32 days since 01/01/1970), seconds (int32
+        seconds of the day), who (categorical) and message"""
+    return compact_frame(
+        pd.DataFrame(
+            {
+                "day": typed["date"],
+                "seconds": typed["time"],
+                "who": typed["who"],
+                "message": pd.Series(typed["message"], dtype=object),
+            }
+        )
+    )
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast a chat DataFrame to the compact dtypes of to_frame (e.g. after a cache read).
+
+    :param df: chat DataFrame with the FRAME_COLUMNS
+    :return: DataFrame with int32 day and seconds, categorical who, Arrow backed messages"""
+    dtypes = {"day": np.int32, "seconds": np.int32, "message": MESSAGE_DTYPE}
+    df = df.astype(
+        {col: dtype for col, dtype in dtypes.items() if df[col].dtype != dtype}
+    )
+    if not isinstance(df.who.dtype, pd.CategoricalDtype):
+        df["who"] = df.who.astype("category")
+    return df
+
+
+def frame_memory(df: pd.DataFrame) -> dict:
+    """Return the bytes taken by a chat DataFrame, per column and per message.
+
+    :param df: chat DataFrame
+    :return: dictionary with messages, bytes per column, total bytes and bytes per message"""
+    usage = df.memory_usage(deep=True, index=False)
+    total = int(usage.sum())
+    return {
+        "messages": len(df),
+        "columns": {col: int(size) for col, size in usage.items()},
+        "total": total,
+        "per_message": round(total / len(df), 1) if len(df) else 0.0,
+    }
+
+
+def concat_frames(frames: list) -> pd.DataFrame:
+    """Concatenate chat DataFrames keeping the senders categorical.
+
+    :param frames: list of chat DataFrames, in chronological order
+    :return: DataFrame with the messages of all the frames"""
+    who = union_categoricals([frame.who for frame in frames])
+    df = pd.concat([frame.drop(columns="who") for frame in frames], ignore_index=True)
+    df.insert(list(frames[0].columns).index("who"), "who", who)
+    return df
+
+
+def append_tail(df: pd.DataFrame, fp, fmt: ChatFormat) -> pd.DataFrame:
+    """Parse the lines appended to an already parsed chat and add their messages to it.
+
+    :param df: chat DataFrame of the previous export
+    :param fp: text stream positioned at the first line after the previous export
+    :param fmt: format of the chat, as sniffed on the previous export
+    :return: the extended DataFrame, None if the new messages are older than the last known one"""
+    lead = []
+    tail = to_frame(to_typed(parse_lines(fp, fmt, lead)))
+    if len(df) == 0:
+        return tail
+    if len(tail) and (tail.day[0], tail.seconds[0]) < (
+        df.day.iloc[-1],
+        df.seconds.iloc[-1],
+    ):
+        return None
+    if lead:  # The last known message went on in the new lines
+        df = df.copy()
+        df.loc[df.index[-1], "message"] = "\n".join([df.message.iloc[-1]] + lead)
+    return concat_frames([df, tail])
+
+
+def parse_frame(file: str, bulk: bool = None, workers: int = None) -> pd.DataFrame:
+    """Extract the chat inside the .txt file as a typed DataFrame.
+
+    :param file: path to the .txt file
+    :param bulk: whether to memory-map the whole file (see read_columns)
+    :param workers: number of parsing processes (see read_columns)
+    :return: DataFrame with day, seconds, who, message (see to_frame)"""
+    return to_frame(to_typed(read_columns(file, bulk, workers)))
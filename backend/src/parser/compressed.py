@@ -0,0 +1,57 @@
+"""
+Ingestion of gzip and zstd compressed exports.
+"""
+
+import gzip
+
+try:
+    import zstandard
+
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Raised while reading a corrupt or truncated compressed stream
+DECOMPRESS_ERRORS = (OSError, EOFError) + ((zstandard.ZstdError,) if HAS_ZSTD else ())
+
+# File extensions of compressed exports, stripped to get the chat name
+EXTENSIONS = (".gz", ".gzip", ".zst", ".zstd")
+
+
+def compression(stream) -> str:
+    """Return how a binary stream is compressed, without moving it.
+
+    :param stream: seekable binary file object
+    :return: "gzip", "zstd" or None if the stream isn't compressed"""
+    pos = stream.tell()
+    magic = stream.read(len(ZSTD_MAGIC))
+    stream.seek(pos)
+    if magic.startswith(GZIP_MAGIC):
+        return "gzip"
+    if magic == ZSTD_MAGIC:
+        return "zstd"
+    return None
+
+
+def decompressing_reader(stream, encoding: str):
+    """Wrap a binary stream in a file object decompressing it while it is read.
+
+    Nothing is decompressed ahead of the reader, so the inflated data never
+    has to fit in memory or on disk. Closing the reader leaves the stream open.
+
+    :param stream: binary file object, doesn't need to be seekable
+    :param encoding: "gzip" (or "x-gzip") or "zstd", as in a Content-Encoding header
+    :return: binary file object with the decompressed data"""
+    encoding = encoding.strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if encoding == "zstd":
+        if not HAS_ZSTD:
+            raise ValueError("zstd compressed uploads are not supported on this server")
+        return zstandard.ZstdDecompressor().stream_reader(
+            stream, read_across_frames=True, closefd=False
+        )
+    raise ValueError(f"Unsupported compression: {encoding}")
@@ -0,0 +1,354 @@
+"""
+Single-pass parsing engine for WhatsApp chat exports.
+"""
+
+import io
+import mmap
+from os import fstat, getpid, path, cpu_count
+from itertools import chain, islice, repeat
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable
+
+from src.parser.normalize import normalize_columns, normalize_messages, normalize_sender
+from src.parser.formats import ChatFormat, get_format, sniff, sniff_buffer, SNIFF_LINES
+
+# Exports at least this big are parsed in bulk mode by default
+BULK_THRESHOLD = 8 * 1024 * 1024
+
+# Exports at least this big are split in PARALLEL_CHUNK sized ranges parsed in parallel
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+PARALLEL_CHUNK = 16 * 1024 * 1024
+
+
+def new_columns() -> dict:
+    """Return empty date, time, who, message columns."""
+    return {"date": [], "time": [], "who": [], "message": []}
+
+
+def to_rows(columns: dict) -> list:
+    """Turn parsed columns into the list of lists returned by get_data.
+
+    :param columns: dictionary with date, time, who, message lists
+    :return: list of lists with date, time, who, message"""
+    return [
+        list(row)
+        for row in zip(
+            columns["date"], columns["time"], columns["who"], columns["message"]
+        )
+    ]
+
+
+def parse_lines(lines: Iterable[str], fmt: ChatFormat, lead: list = None) -> dict:
+    """Parse the lines of a chat written in the given format.
+
+    :param lines: iterable of lines (with their trailing newline)
+    :param fmt: format of the chat, see formats.sniff
+    :param lead: if given, continuation lines found before the first message are
+        appended to it, so they can be stitched to previously parsed messages
+    :return: dictionary with date, time, who, message lists"""
+    search = fmt.pattern.search
+    # Dates, times and senders repeat a lot: normalize each distinct value once
+    days, times, senders = {}, {}, {}
+    columns = new_columns()
+    dates, hours, people, messages = columns.values()
+    parts = None
+    for line in lines:
+        match = search(line)
+        if match is None:
+            if parts is not None:
+                parts.append(line)
+            elif lead is not None:
+                lead.append(line)
+            continue
+        date, time, who, message = match.groups()
+        if who is None:  # Info message, not used in analysis
+            continue
+        if who not in senders:
+            senders[who] = normalize_sender(who)
+        who = senders[who]
+        if who == "info":
+            continue
+        if parts is not None and len(parts) > 1:
+            messages[-1] = "\n".join(parts)
+        if date not in days:
+            days[date] = fmt.normalize_date(date)
+        if time not in times:
+            times[time] = fmt.normalize_time(time)
+        dates.append(days[date])
+        hours.append(times[time])
+        people.append(who)
+        messages.append(message)
+        parts = [message]
+    if parts is not None and len(parts) > 1:
+        messages[-1] = "\n".join(parts)
+    if lead:
+        lead[:] = normalize_messages(lead)
+    return normalize_columns(columns)
+
+
+def parse_buffer(
+    buf, fmt: ChatFormat, pos: int = 0, endpos: int = None, lead: list = None
+) -> dict:
+    """Parse a whole chat buffer (or a range of it) written in the given format.
+
+    Message boundaries are found with a single pass of the byte pattern over
+    the buffer and only the matched fields are decoded, so the chat is never
+    split into lines.
+
+    :param buf: bytes-like object with the utf8 encoded chat (e.g. an mmap)
+    :param fmt: format of the chat, see formats.sniff
+    :param pos: where to start parsing, must be the start of a line
+    :param endpos: where to stop parsing, must be the start of a line (default: end of buf)
+    :param lead: if given, continuation lines found before the first message of the range
+        are appended to it, so they can be stitched to the previous range
+    :return: dictionary with date, time, who, message lists"""
+    if endpos is None:
+        endpos = len(buf)
+    # Dates, times and senders repeat a lot: decode each distinct value once
+    days, times, senders = {}, {}, {}
+    columns = new_columns()
+    dates, hours, people, messages = columns.values()
+    parts = None
+    prev_end = None
+    for match in fmt.byte_pattern.finditer(buf, pos, endpos):
+        start, end = match.span()
+        if prev_end is not None and start - prev_end > 1 and buf[prev_end:start] != b"\r\n":
+            lines = _continuation_lines(buf[prev_end:start])[:-1]
+            if parts is not None:
+                parts.extend(lines)
+            elif lead is not None:
+                lead.extend(lines)
+        prev_end = end
+        date, time, who, message = match.groups()
+        if who is None:  # Info message, not used in analysis
+            continue
+        if who not in senders:
+            senders[who] = normalize_sender(who.decode("utf8"))
+        who = senders[who]
+        if who == "info":
+            continue
+        if parts is not None and len(parts) > 1:
+            messages[-1] = "\n".join(parts)
+        if date not in days:
+            days[date] = fmt.normalize_date(date.decode("ascii"))
+        if time not in times:
+            times[time] = fmt.normalize_time(time.decode("utf8"))
+        message = message.decode("utf8")
+        dates.append(days[date])
+        hours.append(times[time])
+        people.append(who)
+        messages.append(message)
+        parts = [message]
+    if prev_end is not None:
+        tail = _continuation_lines(buf[prev_end:endpos])
+        if tail and tail[-1] == "":
+            tail.pop()
+        if parts is not None:
+            parts.extend(tail)
+        elif lead is not None:
+            lead.extend(tail)
+    if parts is not None and len(parts) > 1:
+        messages[-1] = "\n".join(parts)
+    if lead:
+        lead[:] = normalize_messages(lead)
+    return normalize_columns(columns)
+
+
+def _continuation_lines(gap: bytes) -> list:
+    """Split the bytes between two matches into lines, the same way a text file would.
+
+    The first (empty) line is the rest of the matched line and is dropped. The
+    last element is whatever precedes the next match on its line, without newline.
+
+    :param gap: bytes following a match
+    :return: list of lines, all but the last with their trailing newline"""
+    gap = gap.decode("utf8").replace("\r\n", "\n").replace("\r", "\n")
+    lines = gap.split("\n")[1:]
+    return [line + "\n" for line in lines[:-1]] + lines[-1:]
+
+
+def _map_file(fp) -> mmap.mmap:
+    """Memory-map an open binary file read-only."""
+    if fstat(fp.fileno()).st_size == 0:
+        sniff([])  # Raises, an empty file can't be mapped
+    return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def parse_mapped(file: str) -> dict:
+    """Extract the info inside the .txt file by memory-mapping it.
+
+    :param file: path to the .txt file
+    :return: dictionary with date, time, who, message lists"""
+    with open(file, "rb") as fp, _map_file(fp) as buf:
+        return parse_buffer(buf, sniff_buffer(buf))
+
+
+def split_ranges(buf, fmt: ChatFormat, chunks: int, start: int = 0) -> list:
+    """Split a chat buffer in about equal ranges starting on message lines.
+
+    :param buf: bytes-like object with the utf8 encoded chat
+    :param fmt: format of the chat
+    :param chunks: number of ranges wanted
+    :param start: where the chat starts in buf
+    :return: list of range boundaries, from start to len(buf)"""
+    search = fmt.byte_pattern.search
+    size = len(buf) - start
+    bounds = [start]
+    for i in range(1, chunks):
+        pos = buf.find(b"\n", max(start + size * i // chunks, bounds[-1])) + 1
+        if pos == 0:
+            break
+        match = search(buf, pos)
+        if match is None:
+            break
+        bounds.append(buf.rfind(b"\n", pos - 1, match.start()) + 1)
+    bounds.append(len(buf))
+    return bounds
+
+
+def _parse_chunk(file: str, fmt_name: str, pos: int, endpos: int) -> tuple:
+    """Parse a range of the file in a worker process.
+
+    :return: tuple with the parsed columns and the leading continuation lines"""
+    lead = []
+    with open(file, "rb") as fp, _map_file(fp) as buf:
+        return parse_buffer(buf, get_format(fmt_name), pos, endpos, lead), lead
+
+
+def parse_parallel(file: str, workers: int, start: int = 0) -> dict:
+    """Extract the info inside the .txt file parsing ranges of it in a process pool.
+
+    Continuation lines at the start of a range (e.g. after an info message)
+    belong to the last message of the previous range and are stitched back to it.
+
+    :param file: path to the .txt file
+    :param workers: number of worker processes (and ranges)
+    :param start: where the chat starts in the file
+    :return: dictionary with date, time, who, message lists"""
+    with open(file, "rb") as fp, _map_file(fp) as buf:
+        fmt = sniff_buffer(buf, start)
+        bounds = split_ranges(buf, fmt, workers, start)
+    columns = new_columns()
+    messages = columns["message"]
+    with ProcessPoolExecutor(max_workers=len(bounds) - 1) as pool:
+        chunks = pool.map(
+            _parse_chunk, repeat(file), repeat(fmt.name), bounds[:-1], bounds[1:]
+        )
+        for chunk, lead in chunks:
+            if lead and messages:
+                messages[-1] = "\n".join([messages[-1]] + lead)
+            for key, values in chunk.items():
+                columns[key].extend(values)
+    return columns
+
+
+def read_columns(file: str, bulk: bool = None, workers: int = None) -> dict:
+    """Extract the info inside the .txt file as columns.
+
+    :param file: path to the .txt file
+    :param bulk: whether to memory-map the whole file instead of reading it line by line
+        (default: only for files bigger than BULK_THRESHOLD)
+    :param workers: number of processes parsing the file in parallel (default: one per
+        PARALLEL_CHUNK of file for files bigger than PARALLEL_THRESHOLD, up to the CPU count)
+    :return: dictionary with date, time, who, message lists"""
+    size = path.getsize(file)
+    if workers is None:
+        workers = 1
+        if size >= PARALLEL_THRESHOLD:
+            workers = min(cpu_count() or 1, size // PARALLEL_CHUNK)
+    if workers > 1:
+        return parse_parallel(file, workers)
+    if bulk is None:
+        bulk = size >= BULK_THRESHOLD
+    if bulk:
+        return parse_mapped(file)
+    try:
+        fp = open(file, "r", encoding="utf8")
+    except UnicodeDecodeError:
+        fp = open(file, "r", encoding="latin1")
+    with fp:
+        return read_text(fp)
+
+
+def read_text(fp) -> dict:
+    """Extract the info from an open text stream, reading it line by line.
+
+    :param fp: text file object (e.g. a file or a decompressed archive member)
+    :return: dictionary with date, time, who, message lists"""
+    return read_text_format(fp)[0]
+
+
+def read_text_format(fp) -> tuple:
+    """Extract the info from an open text stream, with the format it was written in.
+
+    :param fp: text file object, read only once from start to end
+    :return: tuple with the dictionary of date, time, who, message lists and the
+        format of the chat"""
+    sample = list(islice(fp, SNIFF_LINES))
+    fmt = sniff(sample)
+    return parse_lines(chain(sample, fp), fmt), fmt
+
+
+def _shared_path(stream, fileno: int) -> str:
+    """Return a path worker processes can open the file of a stream with.
+
+    :param stream: binary file object backed by a file
+    :param fileno: its file descriptor
+    :return: the file path, None if an anonymous file can't be reopened"""
+    name = getattr(stream, "name", None)
+    if isinstance(name, str) and path.isfile(name):
+        return name
+    # Anonymous temporary files (e.g. spooled uploads) are reachable through /proc
+    proc = f"/proc/{getpid()}/fd/{fileno}"
+    return proc if path.exists(proc) else None
+
+
+def read_stream(stream, bulk: bool = None, workers: int = None) -> dict:
+    """Extract the info from a seekable binary stream, from its current position.
+
+    Uploads are parsed from the file the web server spooled them to, so they
+    are never written again under their name: big ones backed by a real
+    file are parsed in parallel or memory-mapped, the others are read line
+    by line.
+
+    :param stream: seekable binary file object (e.g. an uploaded file)
+    :param bulk: whether to memory-map the stream (default: only for streams
+        bigger than BULK_THRESHOLD)
+    :param workers: number of processes parsing the stream's file in parallel
+        (default: as in read_columns)
+    :return: dictionary with date, time, who, message lists"""
+    pos = stream.tell()
+    size = stream.seek(0, io.SEEK_END) - pos
+    stream.seek(pos)
+    try:
+        fileno = stream.fileno()
+    except (AttributeError, OSError):  # In memory, nothing to map or share
+        fileno = None
+    if workers is None:
+        workers = 1
+        if size >= PARALLEL_THRESHOLD:
+            workers = min(cpu_count() or 1, size // PARALLEL_CHUNK)
+    if workers > 1 and fileno is not None:
+        file = _shared_path(stream, fileno)
+        if file is not None:
+            return parse_parallel(file, workers, pos)
+    if bulk is None:
+        bulk = size >= BULK_THRESHOLD
+    if bulk and size and fileno is not None:
+        with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as buf:
+            return parse_buffer(buf, sniff_buffer(buf, pos), pos)
+    fp = io.TextIOWrapper(stream, encoding="utf8")
+    try:
+        return read_text(fp)
+    finally:
+        fp.detach()
+
+
+def parse_chat(file: str, bulk: bool = None, workers: int = None) -> list:
+    """Extract the info inside the .txt file.
+
+    :param file: path to the .txt file
+    :param bulk: whether to memory-map the whole file (see read_columns)
+    :param workers: number of parsing processes (see read_columns)
+    :return: list of lists with date, time, who, message"""
+    return to_rows(read_columns(file, bulk, workers))
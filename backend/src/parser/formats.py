@@ -0,0 +1,155 @@
+"""
+Registry of the chat export formats understood by the parser.
+"""
+
+import re
+from datetime import date
+
+# Lines sampled from the start of a chat to pick its format
+SNIFF_LINES = 50
+
+# 12-hour clock marker: "PM", "pm", "p.m.", "p. m.", optionally after a (narrow) space
+AM_PM = "(?: |\u202f)?" + r"[AaPp]\.? ?[Mm]\.?"
+
+DIGITS = re.compile(r"\d+")
+
+
+class ChatFormat:
+    """Descriptor of the way a device/locale writes the date and time of each message.
+
+    The header pattern must have two groups, the date and the time, and is
+    completed with the optional "who: " group and the message. Non ASCII
+    characters of the header must stay out of character classes, since the
+    same pattern is also compiled over utf8 bytes.
+
+    Dates and times are normalized to dd/mm/yy and HH:MM:SS, so everything
+    after the parser doesn't depend on the format."""
+
+    def __init__(self, name: str, header: str, order: str = "dmy", clock: int = 24):
+        """
+        :param name: unique name of the format
+        :param header: regex matching date and time at the start of a message line
+        :param order: order of day, month and year in the date ("dmy", "mdy" or "ymd")
+        :param clock: 24 or 12 (AM/PM) hours clock
+        """
+        self.name = name
+        self.order = order
+        self.clock = clock
+        self.pattern = re.compile(header + r"(?:(.*?): )?(.*)$")
+        self.byte_pattern = re.compile(
+            header.encode("utf8") + rb"(?:([^\r\n]*?): )?([^\r\n]*)"
+        )
+
+    def __repr__(self) -> str:
+        return f"ChatFormat({self.name!r})"
+
+    def split_date(self, txt: str) -> tuple:
+        """Return day, month and four digit year of a date written in this format."""
+        numbers = dict(zip(self.order, map(int, DIGITS.findall(txt))))
+        year = numbers["y"] + 2000 if numbers["y"] < 100 else numbers["y"]
+        return numbers["d"], numbers["m"], year
+
+    def normalize_date(self, txt: str) -> str:
+        """Return a date written in this format as dd/mm/yy."""
+        day, month, year = self.split_date(txt)
+        return f"{day:02d}/{month:02d}/{year % 100:02d}"
+
+    def normalize_time(self, txt: str) -> str:
+        """Return a time written in this format as HH:MM:SS."""
+        hour, minute, second = (list(map(int, DIGITS.findall(txt))) + [0])[:3]
+        if self.clock == 12:
+            hour = hour % 12 + (12 if "p" in txt.lower() else 0)
+        return f"{hour:02d}:{minute:02d}:{second:02d}"
+
+    def valid_date(self, txt: str) -> bool:
+        """Return whether a date can be read with this format (e.g. no 13th month)."""
+        try:
+            date(*reversed(self.split_date(txt)))
+        except (KeyError, ValueError):
+            return False
+        return True
+
+
+FORMATS = []
+
+
+def register(fmt: ChatFormat) -> ChatFormat:
+    """Add a format to the ones tried by sniff. Earlier formats win ties.
+
+    :param fmt: format descriptor
+    :return: the same descriptor"""
+    if any(other.name == fmt.name for other in FORMATS):
+        raise ValueError(f"Chat format {fmt.name!r} is already registered")
+    FORMATS.append(fmt)
+    return fmt
+
+
+def get_format(name: str) -> ChatFormat:
+    """Return a registered format by name.
+
+    :param name: name of the format
+    :return: format descriptor"""
+    for fmt in FORMATS:
+        if fmt.name == name:
+            return fmt
+    raise KeyError(f"Unknown chat format {name!r}")
+
+
+def sniff(lines: list) -> ChatFormat:
+    """Pick the format of a chat from its first lines.
+
+    Every registered format is matched against the sample, the one matching
+    most lines with only valid dates wins.
+
+    :param lines: first SNIFF_LINES lines of the chat
+    :return: format descriptor"""
+    best, best_count = None, 0
+    for fmt in FORMATS:
+        matches = [m for m in map(fmt.pattern.search, lines) if m is not None]
+        if len(matches) > best_count and all(
+            fmt.valid_date(m.group(1)) for m in matches
+        ):
+            best, best_count = fmt, len(matches)
+    if best is not None:
+        return best
+
+    txt = lines[0].rstrip("\n") if lines else ""
+    raise ValueError(f"Couldn't detect the chat format. Anonymous text:\n{txt[:50]}")
+
+
+def sniff_buffer(buf, pos: int = 0) -> ChatFormat:
+    """Pick the format of a chat from the first lines of its utf8 buffer.
+
+    :param buf: bytes-like object with the utf8 encoded chat (e.g. an mmap)
+    :param pos: where the chat starts in buf
+    :return: format descriptor"""
+    lines = []
+    while len(lines) < SNIFF_LINES and pos < len(buf):
+        end = buf.find(b"\n", pos)
+        end = len(buf) if end == -1 else end + 1
+        lines.append(bytes(buf[pos:end]).decode("utf8", "ignore"))
+        pos = end
+    return sniff(lines)
+
+
+_IOS = r"\[{date},? {time}\] "
+_ANDROID = r"{date},? {time} - "
+_DMY = r"(\d{1,2}/\d{1,2}/(?:\d{4}|\d{2}))"
+_DOTTED = r"(\d{1,2}\.\d{1,2}\.(?:\d{4}|\d{2}))"
+_ISO = r"(\d{4}-\d{2}-\d{2})"
+_SECONDS = r"(\d{1,2}:\d{2}:\d{2})"
+_MINUTES = r"(\d{1,2}:\d{2})"
+
+# The formats WhatsApp Wrapped was first written for
+register(ChatFormat("IOS", r"\[(\d{2}/\d{2}/\d{2}), (\d{2}:\d{2}:\d{2})\] "))
+register(ChatFormat("Android", r"(\d{2}/\d{2}/\d{2}), (\d{2}:\d{2}) - "))
+
+# Other locales. Slash dates with AM/PM are month first unless a day says otherwise
+for device, layout, time in (("IOS", _IOS, _SECONDS), ("Android", _ANDROID, _MINUTES)):
+    register(ChatFormat(f"{device} d/m/y", layout.format(date=_DMY, time=time)))
+    register(ChatFormat(f"{device} d.m.y", layout.format(date=_DOTTED, time=time)))
+    register(ChatFormat(f"{device} y-m-d", layout.format(date=_ISO, time=time), "ymd"))
+    time = time[:-1] + AM_PM + ")"
+    register(ChatFormat(f"{device} m/d/y 12h", layout.format(date=_DMY, time=time), "mdy", 12))
+    register(ChatFormat(f"{device} d/m/y 12h", layout.format(date=_DMY, time=time), "dmy", 12))
+    register(ChatFormat(f"{device} d.m.y 12h", layout.format(date=_DOTTED, time=time), "dmy", 12))
@@ -0,0 +1,78 @@
+"""
+Text normalization stage of the chat parser.
+
+Senders and messages are normalized once, when the chat is parsed, so that
+plots, messages and analytics can use the DataFrame columns as they are.
+"""
+
+# Emoji modifiers (variation selector, keycap, skin tones) the PDF fonts can't render
+FONT_UNFRIENDLY = "\ufe0f\u20e3\U0001f3fb\U0001f3fc\U0001f3fd\U0001f3fe\U0001f3ff"
+FONT_TABLE = str.maketrans("", "", FONT_UNFRIENDLY)
+
+# Invisible marks added by WhatsApp around attachments and edited messages
+LEFT_TO_RIGHT_MARK = "\u200e"
+INVISIBLE_MARKS = (LEFT_TO_RIGHT_MARK,)
+
+
+def normalize_sender(txt: str) -> str:
+    """Return a sender name without the characters the PDF fonts can't render.
+
+    :param txt: sender name as written in the chat
+    :return: normalized name"""
+    return txt.translate(FONT_TABLE)
+
+
+def normalize_messages(messages: list) -> list:
+    """Remove the invisible marks from a whole column of messages.
+
+    Deleting a handful of characters is done with str.replace, which unlike
+    str.translate stays in C for non ASCII characters.
+
+    :param messages: list of message texts
+    :return: list of normalized message texts"""
+    for mark in INVISIBLE_MARKS:
+        messages = [message.replace(mark, "") for message in messages]
+    return messages
+
+
+def normalize_columns(columns: dict) -> dict:
+    """Normalize the message column of parsed columns in place.
+
+    Senders are normalized while parsing, once per distinct name, since
+    the normalized name decides whether a message is kept.
+
+    :param columns: dictionary with date, time, who, message lists
+    :return: the same dictionary"""
+    columns["message"] = normalize_messages(columns["message"])
+    return columns
+
+
+def bubble_lines(txt: str, char_per_line: int = 50) -> list:
+    """Split a text in the lines of a message bubble (at most three).
+
+    Lines break on newlines and, like the original character loop did,
+    after char_per_line characters on the first piece of a line and
+    char_per_line + 1 on the following ones.
+
+    :param txt: text of the bubble
+    :param char_per_line: characters that fit in a bubble line
+    :return: list of bubble lines"""
+    lines = []
+    for line in txt.split("\n"):
+        lines.append(line[:char_per_line])
+        for start in range(char_per_line, len(line), char_per_line + 1):
+            lines.append(line[start : start + char_per_line + 1])
+        if len(lines) >= 3:
+            break
+    return lines[:3]
+
+
+def bubble_size(txt: str, char_per_line: int = 50) -> int:
+    """Return how many lines (up to three) the message bubble of a text needs.
+
+    :param txt: text of the bubble
+    :param char_per_line: characters that fit in a bubble line
+    :return: 1, 2 or 3"""
+    lines = txt.split("\n")
+    size = len(lines) + sum(len(line) // char_per_line for line in lines)
+    return min(size, 3)
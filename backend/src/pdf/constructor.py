@@ -15,6 +15,8 @@ from matplotlib import rcParams
 
 from src.utils import *
 from src.pdf.plots import Plotter
+from src.parser.columnar import frame_memory, parse_frame
+from src.stats.chat import ChatStats
 
 # PDF dimensions and layout constants
 HEIGHT = 297
@@ -45,14 +47,22 @@ class PDF_Constructor(FPDF):
 
     img_path = path.join(BASE_DIR, "../../static/")
 
-    def __init__(self, file: str, lang: str = "en") -> None:
+    def __init__(
+        self,
+        file: str,
+        lang: str = "en",
+        df: pd.DataFrame = None,
+        media_count: int = None,
+    ) -> None:
         """Initialize the PDF constructor.
 
-        :param file: path to the WhatsApp chat text file
-        :param lang: language of the PDF ("en" or "it")"""
+        :param file: path to the WhatsApp chat text file (only its name if df is given)
+        :param lang: language of the PDF ("en" or "it")
+        :param df: already parsed chat (e.g. from an uploaded archive), skips reading file
+        :param media_count: number of media files sent, when known from the archive"""
 
         # Prepare the file
-        if not path.exists(file):
+        if df is None and not path.exists(file):
             print("No such file exists")
             self.ok = 0
         else:
@@ -71,13 +81,11 @@ class PDF_Constructor(FPDF):
         FPDF.__init__(self)
         self.counter = 0
         self.lang = lang
+        self.media_count = media_count
 
         # Prepare the dataframe
-        self.df = pd.DataFrame(
-            get_data(file), columns=["date", "time", "who", "message"]
-        )
-        self.df.date = pd.to_datetime(self.df.date, format='mixed', dayfirst=True)
-        self.df.time = pd.to_timedelta(self.df.time)
+        self.df = parse_frame(file) if df is None else df
+        self.stats = ChatStats(self.df, media_count)
         self.group = True
         if len(set(self.df.who)) == 3 and "info" in set(self.df.who):
             self.group = False
@@ -94,7 +102,7 @@ class PDF_Constructor(FPDF):
         self.load = (self.pos["left"] / HEIGHT * self.pos["right"] / HEIGHT) * 100
 
         # Plotter
-        self.plotter = Plotter(self.df, OUTPUT, lang)
+        self.plotter = Plotter(self.df, OUTPUT, lang, stats=self.stats)
 
         # Set the font
         prop = FontProperties(fname=get_data_file_path("my_fonts/seguiemj.ttf"))
@@ -231,15 +239,20 @@ class PDF_Constructor(FPDF):
         self.plotter.plot_emojis(who=who, reverse=reverse, info=info)
         self.add_image(self.plot_pos[pos], self.update_y(pos, "plot"))
 
-    def add_number_of_messages_plot(self, pos: str, interval: str = "day") -> None:
+    def add_number_of_messages_plot(
+        self, pos: str, interval: str = "day", until_last_message: bool = False
+    ) -> None:
         """Add the number of messages plot to the PDF.
 
         :param pos: "left" or "right" position on the PDF
-        :param interval: interval for the plot ("day", "week", "month", "year")"""
+        :param interval: interval for the plot ("day", "week", "month", "year")
+        :param until_last_message: end the plot at the last message instead of today"""
 
         if not self.prep():
             return
-        self.plotter.plot_number_of_messages(interval=interval)
+        self.plotter.plot_number_of_messages(
+            interval=interval, until_last_message=until_last_message
+        )
         self.add_image(self.plot_pos[pos], self.update_y(pos, "plot"))
 
     def add_day_of_the_week_plot(self, pos: str):
@@ -300,6 +313,9 @@ class PDF_Constructor(FPDF):
         - avg_response_time
         - swear_count
         - avg_message_length
+        - laugh_count
+        - love_count
+        - greeting_count
 
         :param cat: category of the message to add
         :param pos: "left" or "right" position on the PDF"""
@@ -308,7 +324,7 @@ class PDF_Constructor(FPDF):
             return
 
         def message_count(self):
-            num = len(self.df) if len(self.df) < 39900 else "40000+"
+            num = self.stats.total if self.stats.total < 39900 else "40000+"
             txt = {
                 "en": f"{num} messages have been sent!\nYou chat so much 🤩",
                 "it": f"Sono stati mandati {num} messaggi!\nVi scrivete un botto! 🤩",
@@ -316,7 +332,7 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def active_days(self):
-            total = len(set(self.df.date))
+            total = self.stats.active_days
             txt = {
                 "en": f"This group has benn active in {total} different days! 🧐",
                 "it": f"Vi siete scritti in {total} giorni diversi! 🧐",
@@ -324,8 +340,8 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def messages_per_day(self):
-            message_ratio = len(self.df) / len(
-                pd.date_range(self.df.date[0], date.today())
+            message_ratio = self.stats.total / len(
+                pd.date_range(self.stats.first_day, date.today())
             )
             message_ratio = round(message_ratio, 2)
             txt = {
@@ -335,7 +351,7 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def file_count(self):
-            files = len(self.df[self.df.message == "<Media omessi>"])
+            files = self.stats.files_sent
             txt = {
                 "en": f"{files} files have been sent in this chatroom!",
                 "it": f"Sono stati inviati {files} file!",
@@ -343,10 +359,8 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def most_active_day(self):
-            num = max([len(self.df[self.df.date == i]) for i in set(self.df.date)])
-            day = max(
-                set(self.df.date), key=lambda d: len(self.df[self.df.date == d])
-            ).strftime("%d/%m/%y")
+            day, num = self.stats.most_active_day()
+            day = day.strftime("%d/%m/%y")
             txt = {
                 "en": f"The most active day has been {day}\n{num} total messages, incredible 🤯",
                 "it": f"Il giorno più attivo è stato il {day}\n{num} messaggi in totale, che giornata 🤯",
@@ -354,12 +368,7 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def most_active_year(self):
-            lst = [
-                len(self.df[self.df.date.dt.year == i])
-                for i in set(self.df.date.dt.year)
-            ]
-            best, year = max_and_index(lst)
-            year = list(set(self.df.date.dt.year))[year]
+            year, best = self.stats.most_active_year()
             txt = {
                 "en": f"Most active year: {year} ({best} messaggi)\nThere were some great memories 💭",
                 "it": f"Anno più attivo: {year} ({best} messaggi)\nChe memorie 💭",
@@ -367,14 +376,8 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def most_active_month(self):
-            lst = [
-                len(self.df[self.df.date.dt.to_period("M").dt.to_timestamp() == i])
-                for i in set(self.df.date.dt.to_period("M").dt.to_timestamp())
-            ]
-            best, month = max_and_index(lst)
-            month = list(set(self.df.date.dt.to_period("M").dt.to_timestamp()))[
-                month
-            ].strftime("%m/%y")
+            month, best = self.stats.most_active_month()
+            month = month.strftime("%m/%y")
             txt = {
                 "en": f"Most active month: 👇\n{month} ({best} messaggi)",
                 "it": f"Mese più attivo: 👇\n{month} ({best} messaggi)",
@@ -382,19 +385,7 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def most_active_weekday(self):
-            lst = [
-                len(self.df[self.df.date.dt.day_name() == i])
-                for i in [
-                    "Monday",
-                    "Tuesday",
-                    "Wednesday",
-                    "Thursday",
-                    "Friday",
-                    "Saturday",
-                    "Sunday",
-                ]
-            ]
-            best, weekday = max_and_index(lst)
+            weekday, best = self.stats.most_active_weekday()
             txt = {
                 "en": f'Most active weekday: {["Lunedì", "Martedì", "Mercoledì", "Giovedì", "Venerdì", "Sabato", "Domenica"][weekday]} ({best} messaggi)',
                 "it": f'Giorno più attivo: {["Lunedì", "Martedì", "Mercoledì", "Giovedì", "Venerdì", "Sabato", "Domenica"][weekday]} ({best} messaggi)',
@@ -402,10 +393,8 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def most_active_person(self):
-            people = {k: len(self.df[self.df.who == k]) for k in set(self.df.who)}
-            person, total = list(sort_dict(people, 1, others=False).items())[0]
-            percent = 100 * round(total / len(self.df), 2)
-            person = font_friendly(person)
+            person, total = self.stats.most_active_person()
+            percent = 100 * round(total / self.stats.total, 2)
             txt = {
                 "en": f"{person} is the most active person!\n They wrote {total} messages ({percent}% of the total) 🤙",
                 "it": f"{person} è la persona più attiva!\n Ha scritto {total} messaggi ({percent}% del totale) 🤙",
@@ -413,20 +402,7 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def longest_active_streak(self):
-            dates = sorted(list(set(self.df.date)))
-            start = dates[0]
-            end = dates[0]
-            best_streak = 0
-            curr_streak = 0
-            for i in range(1, len(dates)):
-                if dates[i] - dates[i - 1] != timedelta(days=1):
-                    if curr_streak > best_streak:
-                        best_streak = curr_streak
-                        start = dates[i - 1 - curr_streak]
-                        end = dates[i - 1]
-                    curr_streak = 0
-                else:
-                    curr_streak += 1
+            start, end, best_streak = self.stats.calendar.longest_streak()
             start, end = start.strftime("%d/%m/%y"), end.strftime("%d/%m/%y")
             txt = {
                 "en": f"Longest active streak: {best_streak} days\nFrom {start} to {end} ❤️",
@@ -435,20 +411,15 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def longest_inactive_streak(self):
-            dates = sorted(list(set(self.df.date)))
-            start = "01/01/1900"
-            end = "01/01/1900"
-            best_streak = timedelta(days=1)
-            for i in range(1, len(dates)):
-                if dates[i] - dates[i - 1] > best_streak:
-                    start = dates[i - 1]
-                    end = dates[i]
-                    best_streak = dates[i] - dates[i - 1]
-            start, end, best_streak = (
-                start.strftime("%d/%m/%y"),
-                end.strftime("%d/%m/%y"),
-                best_streak.days,
-            )
+            gap = self.stats.calendar.longest_gap()
+            if gap is None:
+                txt = {
+                    "en": "Not a single day without messages! 🔥",
+                    "it": "Neanche un giorno senza messaggi! 🔥",
+                }
+                return txt[self.lang]
+            start, end, best_streak = gap
+            start, end = start.strftime("%d/%m/%y"), end.strftime("%d/%m/%y")
             txt = {
                 "en": f"Longest inactive streak: {best_streak} days\nFrom {start} to {end} ☠️",
                 "it": f"Streak di giorni inattivi più lunga: {best_streak} giorni\nDal {start} al {end} ☠️",
@@ -456,15 +427,7 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def first_texter(self):
-            people = {}
-            for i in range(1, len(self.df)):
-                if self.df.date[i] != self.df.date[i - 1]:
-                    who = self.df.who[i]
-                    if who not in people:
-                        people[who] = 0
-                    people[who] += 1
-            people = sort_dict(people, 1, others=False, lang=self.lang)
-            person = font_friendly(list(people.keys())[0])
+            person = self.stats.replies.opener_counts().index[0]
             txt = {
                 "en": f"It's usually {person} who writes first... 🥇",
                 "it": f"Solitamente è {person} che scrive per prim*... 🥇",
@@ -472,16 +435,9 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def avg_response_time(self):
-            resp_list = []
-            date_and_time = self.df.date + self.df.time
-            for i in range(1, len(self.df)):
-                resp_list.append(date_and_time[i] - date_and_time[i - 1])
+            replies = self.stats.replies
             first_quartile, last_quartile = len(self.df) // 4, len(self.df) * 3 // 4
-            iqr_mean = (
-                sum(resp_list[first_quartile:last_quartile], timedelta(0))
-                / len(resp_list)
-                / 2
-            )
+            iqr_mean = replies.central_mean(first_quartile, last_quartile, len(replies))
             seconds, minutes, hours, days = (
                 iqr_mean.seconds % 60,
                 iqr_mean >= timedelta(minutes=1),
@@ -497,15 +453,7 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def swear_count(self):
-            tot = 0
-            words_dict = get_message_freq_dict(self.df.message)
-            swears = [
-                i[:-1]
-                for i in open(path.join(BASE_DIR, "../../lists/parolacce.txt"), "r")
-            ]
-            for swear in swears:
-                if swear in words_dict.keys():
-                    tot += words_dict[swear]
+            tot = self.stats.phrases.count("swears")
             txt = {
                 "en": f"{tot} swear words have been sent 🤬",
                 "it": f"Sono state dette {tot} parolacce 🤬",
@@ -513,16 +461,41 @@ class PDF_Constructor(FPDF):
             return txt[self.lang]
 
         def avg_message_length(self):
-            lst = [
-                len(word) for word in [message.split() for message in self.df.message]
-            ]
-            avg = round(sum(lst) / len(lst), 2)
+            avg = self.stats.avg_words_per_message()
             txt = {
                 "en": f"On average there are {avg} words in a message 🔎",
                 "it": f"Ci sono in media {avg} parole in un messaggio 🔎",
             }
             return txt[self.lang]
 
+        def laugh_count(self):
+            tot = self.stats.phrases.count("laughs")
+            top = self.stats.phrases.top_sender("laughs")
+            txt = {
+                "en": f"You laughed {tot} times 😂",
+                "it": f"Avete riso {tot} volte 😂",
+            }
+            if top is not None:
+                txt["en"] += f"\n{top[0]} is the one laughing the most"
+                txt["it"] += f"\nChi ride di più è {top[0]}"
+            return txt[self.lang]
+
+        def love_count(self):
+            tot = self.stats.phrases.count("love")
+            txt = {
+                "en": f"{tot} words of love have been sent 🥰",
+                "it": f"Vi siete scritti {tot} parole d'amore 🥰",
+            }
+            return txt[self.lang]
+
+        def greeting_count(self):
+            tot = self.stats.phrases.count("greetings")
+            txt = {
+                "en": f"You greeted each other {tot} times 👋",
+                "it": f"Vi siete salutati {tot} volte 👋",
+            }
+            return txt[self.lang]
+
         possibilities = [
             "message_count",
             "active_days",
@@ -539,6 +512,9 @@ class PDF_Constructor(FPDF):
             "avg_response_time",
             "swear_count",
             "avg_message_length",
+            "laugh_count",
+            "love_count",
+            "greeting_count",
         ]
         if cat in possibilities:
             txt = eval(cat + "(self)")
@@ -556,17 +532,18 @@ class PDF_Constructor(FPDF):
         }
         img_offset = {"right": 2, "left": 5}
         pos_to_color = {"left": "white", "right": "green"}
-        y = self.update_y(pos, "message", check_text(txt))
+        size = check_text(txt)
+        y = self.update_y(pos, "message", size)
         self.image(
             name=path.join(
                 PDF_Constructor.img_path,
-                f"{pos_to_color[pos]}_{check_text(txt)}line_bubble.png",
+                f"{pos_to_color[pos]}_{size}line_bubble.png",
             ),
-            x=txt_pos[(pos, check_text(txt))] - img_offset[pos],
+            x=txt_pos[(pos, size)] - img_offset[pos],
             y=y - 4,
             w=100,
         )
-        self.set_xy(txt_pos[(pos, check_text(txt))], y)
+        self.set_xy(txt_pos[(pos, size)], y)
         self.multi_cell(w=WIDTH / 2 - 5, txt=transform_text(txt), h=5)
 
     def save(self) -> str:
@@ -606,68 +583,68 @@ class PDF_Constructor(FPDF):
                 remove(file_path)
         return output_path
 
+    def memory_usage(self) -> dict:
+        """Return the memory taken by the parsed chat.
+
+        :return: dictionary with messages, bytes per column, total bytes and bytes per message"""
+        return frame_memory(self.df)
+
     def get_analytics(self) -> dict:
         """Return aggregate analytics about the parsed chat.
 
         :return: dictionary with analytics"""
 
         df = self.df
+        stats = self.stats
 
-        total_messages = len(df)
-        participants = set(df.who)
-        if "info" in participants:
-            participants.remove("info")
-        participants_count = len(participants)
+        total_messages = stats.total
+        participants_count = len(stats.sender_counts)  # The per sender table stays lazy
         is_group = self.group
 
-        start_date = pd.to_datetime(df.date.min()).date() if total_messages else None
-        end_date = pd.to_datetime(df.date.max()).date() if total_messages else None
-        active_days = len(set(df.date)) if total_messages else 0
+        start_date = stats.day_counts.index[0].date() if total_messages else None
+        end_date = stats.day_counts.index[-1].date() if total_messages else None
+        active_days = stats.active_days
 
         days_range = (
-            max(1, len(pd.date_range(df.date.iloc[0], date.today())))
+            max(1, len(pd.date_range(stats.first_day, date.today())))
             if total_messages
             else 1
         )
         avg_msgs_per_day = round(total_messages / days_range, 2)
 
         if total_messages:
-            weekday_counts = df.date.dt.dayofweek.value_counts()
-            most_active_weekday = (
-                int(weekday_counts.idxmax()) if len(weekday_counts) else None
-            )
-            month_counts = df.date.dt.to_period("M").value_counts()
-            most_active_month = (
-                str(month_counts.idxmax()) if len(month_counts) else None
-            )
+            most_active_weekday = stats.most_active_weekday()[0]
+            most_active_month = str(stats.most_active_month()[0])
         else:
             most_active_weekday = None
             most_active_month = None
 
-        files_shared_count = int(
-            df.message.fillna("").str.contains("<Media", na=False).sum()
-        )
+        if self.media_count:  # Archives exported without media hold none
+            files_shared_count = self.media_count
+        else:
+            files_shared_count = int(
+                df.message.fillna("").str.contains("<Media", na=False).sum()
+            )
 
         avg_message_length_words = (
-            round(sum(len(str(m).split()) for m in df.message) / total_messages, 2)
-            if total_messages
-            else 0.0
+            stats.avg_words_per_message() if total_messages else 0.0
         )
 
         resp_seconds = None
         if total_messages > 1:
-            deltas = (df.date + df.time).diff().dropna()
-            if len(deltas) > 0:
-                first_q = len(deltas) // 4
-                last_q = len(deltas) * 3 // 4
-                denom = max(1, (last_q - first_q))
-                iqr_mean = sum(deltas.iloc[first_q:last_q], timedelta(0)) / denom / 2
-                resp_seconds = int(iqr_mean.total_seconds())
-
-        # Use utility functions for complex analytics
-        daily_message_counts = get_daily_message_counts(df, interval="day")
-        most_used_words = get_most_used_words(df, max_words=100)
-        most_used_emojis = get_most_used_emojis(df, max_emojis=15)
+            gaps = len(stats.replies)
+            first_q, last_q = gaps // 4, gaps * 3 // 4
+            denom = max(1, last_q - first_q)
+            iqr_mean = stats.replies.central_mean(first_q, last_q, denom)
+            resp_seconds = int(iqr_mean.total_seconds())
+
+        sessions_count = len(stats.sessions)
+
+        # Shared with the plots through the metric graph of ChatStats
+        daily_message_counts = stats.message_counts("day")
+        most_used_words = stats.top_words(max_words=100)
+        most_used_words_error = stats.top_words_error(max_words=100)
+        most_used_emojis = stats.top_emojis(max_emojis=15)
 
         return {
             "total_messages": total_messages,
@@ -682,8 +659,10 @@ class PDF_Constructor(FPDF):
             "files_shared_count": files_shared_count,
             "avg_message_length_words": avg_message_length_words,
             "response_seconds_typical": resp_seconds,
+            "sessions_count": sessions_count,
             "lang": self.lang,
             "daily_message_counts": daily_message_counts,
             "most_used_words": most_used_words,
+            "most_used_words_error": most_used_words_error,
             "most_used_emojis": most_used_emojis,
         }
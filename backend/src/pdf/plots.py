@@ -13,19 +13,29 @@ from wordcloud import WordCloud
 from datetime import date, timedelta
 
 from src.utils import *
+from src.stats.chat import ChatStats
+from src.lexicon import STOP_WORDS
 
 
 class Plotter:
     """Class for creating and saving WhatsApp Wrapped plots with common parameters."""
 
-    def __init__(self, df: pd.DataFrame, output_path: str, lang: str = "en"):
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        output_path: str,
+        lang: str = "en",
+        stats: ChatStats = None,
+    ):
         """Initialize Plotter with common parameters.
 
         :param df: DataFrame containing chat data
         :param output_path: path to save the plots
         :param lang: language for titles and labels ("en" or "it")
+        :param stats: aggregates of the chat, shared with the PDF messages
         """
         self.df = df
+        self.stats = stats if stats is not None else ChatStats(df)
         self.output_path = output_path
         self.lang = lang
         self.counter = 0
@@ -65,7 +75,9 @@ class Plotter:
         prop = FontProperties(fname=font_path)
         rcParams["font.family"] = prop.get_name()
 
-        emoji_data = get_most_used_emojis(self.df, max_emojis=7, who=who)
+        who = who if who in self.stats.sender_counts.index else None
+        # Labels the font can draw: skin tones, ZWJ sequences and flags merged
+        emoji_data = self.stats.top_emojis(max_emojis=7, who=who, labels=True)
         emojis = {emoji: count for emoji, count in emoji_data}
         emojis = sort_dict(emojis, 7, reverse=reverse, others=False, lang=self.lang)
         if len(emojis.keys()) == 0:
@@ -118,13 +130,16 @@ class Plotter:
         )
         self.save_image()
 
-    def plot_number_of_messages(self, interval: str = "day") -> None:
+    def plot_number_of_messages(
+        self, interval: str = "day", until_last_message: bool = False
+    ) -> None:
         """Plot number of messages per interval and save to output_path.
 
         :param interval: time interval for grouping messages ("day", "week", "month", "year")
+        :param until_last_message: end the plot at the last message instead of today
         """
 
-        daily_counts = get_daily_message_counts(self.df, interval=interval)
+        daily_counts = self.stats.message_counts(interval, until_last_message)
         if not daily_counts:
             return
         x_pos = [pd.to_datetime(day) for day, _ in daily_counts]
@@ -141,7 +156,10 @@ class Plotter:
             running_average.append((sum(window)) / 5)
 
         plt.plot(x_pos, y_pos, color="#26d367")
-        diff = pd.to_datetime(date.today()) - self.df.date.iloc[0]
+        last = pd.to_datetime(date.today())
+        if until_last_message:
+            last = self.stats.day_counts.index[-1]
+        diff = last - self.stats.first_day
         if (
             (interval == "month" and diff > timedelta(days=360))
             or (interval == "week" and diff > timedelta(days=180))
@@ -195,7 +213,7 @@ class Plotter:
                 "Domenica",
             ],
         }
-        y_pos = [len(self.df[self.df.date.dt.day_name() == i]) for i in weekday["en"]]
+        y_pos = self.stats.weekday_counts.tolist()
         spider_plot(weekday[self.lang], y_pos)
         title = {
             "en": "Number of messages per weekday:",
@@ -210,7 +228,7 @@ class Plotter:
         :param wordcloud: whether to plot a wordcloud (True) or barplot (False)
         """
 
-        most_used_words_data = get_most_used_words(self.df, max_words=100)
+        most_used_words_data = self.stats.top_words(max_words=100)
         most_used_words = {word: count for word, count in most_used_words_data}
 
         if wordcloud:
@@ -218,7 +236,7 @@ class Plotter:
                 width=400,
                 height=300,
                 max_words=100,
-                stopwords=stopwords,
+                stopwords=STOP_WORDS,
                 min_font_size=6,
                 background_color=None,
                 mode="RGBA",
@@ -243,11 +261,7 @@ class Plotter:
         :param group: whether to plot a grouped barh (True) or pie chart (False)
         :param name: name of the group (if group is True)
         """
-        people = {
-            font_friendly(k): len(self.df[self.df.who == k]) for k in set(self.df.who)
-        }
-        if "info" in people.keys():
-            people.pop("info")
+        people = self.stats.sender_counts.to_dict()
         people = sort_dict(people, 7, reverse=True, lang=self.lang)
         if group:
             title = {
@@ -299,8 +313,7 @@ class Plotter:
         plt.title(title[self.lang])
         x_pos = [timedelta(hours=i // 2, minutes=30 * (i % 2)) for i in range(0, 48)]
         x_pos = x_pos[6:] + x_pos[:6]
-        slotted_times = [i.floor("30min") for i in self.df.time]
-        y_pos = [slotted_times.count(i) for i in x_pos]
+        y_pos = self.stats.slot_counts[x_pos].tolist()
         x_pos_fmt = [
             f"{'0' if i < timedelta(hours=10) else ''}{str(i)[:-3]}" for i in x_pos
         ]
@@ -75,6 +75,27 @@ def seed3(pdf: PDF_Constructor):
     pdf.add_message(cat="active_days", pos="right")
 
 
+def seed4(pdf: PDF_Constructor):  # Lexicon based messages (laughs, love, greetings)
+
+    pdf.add_number_of_messages_plot(interval="week", pos="left")
+
+    pdf.add_message(cat="laugh_count", pos="left")
+
+    pdf.add_most_used_words_plot(pos="left")
+
+    pdf.add_message(cat="swear_count", pos="left")
+
+    pdf.add_message(cat="love_count", pos="right")
+
+    pdf.add_message(cat="greeting_count", pos="right")
+
+    pdf.add_emoji_plot(pos="right")
+
+    pdf.add_message(cat="first_texter", pos="right")
+
+    pdf.add_time_of_messages_plot(pos="right")
+
+
 def main():
 
     file = "../text_files/Chat WhatsApp con ESEMPIO.txt"
@@ -0,0 +1,140 @@
+"""
+Streaks of active and inactive days of a chat.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def interval_counts(day_counts: pd.Series, first, last, interval: str = "day") -> list:
+    """Group messages per day into the intervals of a range, empty intervals included.
+
+    The range starts one interval before the first day, aligned to the
+    interval (Monday, first of the month or of the year), and ends at last.
+
+    :param day_counts: messages per day, indexed by date
+    :param first: first day of the chat
+    :param last: last day of the range (e.g. today)
+    :param interval: "day", "week", "month" or "year"
+    :return: list of tuples (str of the interval start, count), [] for other intervals"""
+    ranges = {
+        "day": lambda: pd.date_range(first, last, freq="D"),
+        "week": lambda: pd.date_range(
+            first - pd.tseries.offsets.Week(1), last, freq="W-MON"
+        ),
+        "month": lambda: pd.date_range(
+            first - pd.tseries.offsets.MonthBegin(1), last, freq="MS"
+        ),
+        "year": lambda: pd.date_range(
+            first - pd.tseries.offsets.YearBegin(1), last, freq="YS"
+        ),
+    }
+    if interval not in ranges:
+        return []
+
+    days = day_counts.index
+    starts = {
+        "day": lambda: days,
+        "week": lambda: days - pd.to_timedelta(days.weekday, unit="D"),
+        "month": lambda: days.to_period("M").to_timestamp(),
+        "year": lambda: days.to_period("Y").to_timestamp(),
+    }
+    x_pos = ranges[interval]()
+    counts = day_counts.groupby(starts[interval]()).sum().reindex(x_pos, fill_value=0)
+    return [(str(i), int(point)) for i, point in zip(x_pos, counts)]
+
+
+def to_timestamp(day: int) -> pd.Timestamp:
+    """Return the date of a day counted from 01/01/1970."""
+    return pd.Timestamp(int(day), unit="D")
+
+
+class Calendar:
+    """Active days of a chat as a sorted array of integer days (since 01/01/1970).
+
+    An active streak is a run of consecutive active days, an inactive streak
+    the days without messages between two active days. Both are found with
+    array differences, so asking for more streaks costs nothing but the
+    output."""
+
+    def __init__(self, days: np.ndarray):
+        """
+        :param days: days with at least one message, in any order and with repetitions
+        """
+        self.days = np.unique(np.asarray(days, dtype=np.int64))
+        # Runs of consecutive days: a new one starts after every missing day
+        breaks = np.flatnonzero(np.diff(self.days) != 1) + 1
+        self.run_starts = np.concatenate(([0], breaks)) if len(self.days) else breaks
+        self.run_lengths = np.diff(np.append(self.run_starts, len(self.days)))
+        # Inactive streaks: the missing days between two active days
+        idle_lengths = np.diff(self.days) - 1
+        idle = np.flatnonzero(idle_lengths > 0)
+        self.gap_starts = self.days[idle] + 1
+        self.gap_lengths = idle_lengths[idle]
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def streaks(self) -> pd.DataFrame:
+        """Return every active streak with its first day, last day and length in days."""
+        first = self.days[self.run_starts]
+        return pd.DataFrame(
+            {
+                "start": first,
+                "end": first + self.run_lengths - 1,
+                "days": self.run_lengths,
+            }
+        )
+
+    def gaps(self) -> pd.DataFrame:
+        """Return every inactive streak with its first day, last day and length in days."""
+        return pd.DataFrame(
+            {
+                "start": self.gap_starts,
+                "end": self.gap_starts + self.gap_lengths - 1,
+                "days": self.gap_lengths,
+            }
+        )
+
+    @staticmethod
+    def _top(starts: np.ndarray, lengths: np.ndarray, n: int) -> list:
+        """Return the n longest runs as (first day, last day, days), earliest first on ties."""
+        top = np.argsort(-lengths, kind="stable")[:n]
+        return [
+            (
+                to_timestamp(starts[i]),
+                to_timestamp(starts[i] + lengths[i] - 1),
+                int(lengths[i]),
+            )
+            for i in top
+        ]
+
+    def top_streaks(self, n: int = 1) -> list:
+        """Return the n longest active streaks as (first day, last day, days)."""
+        return self._top(self.days[self.run_starts], self.run_lengths, n)
+
+    def top_gaps(self, n: int = 1) -> list:
+        """Return the n longest inactive streaks as (first day, last day, days)."""
+        return self._top(self.gap_starts, self.gap_lengths, n)
+
+    def longest_streak(self):
+        """Return the longest active streak as (first day, last day, days), None without messages."""
+        top = self.top_streaks(1)
+        return top[0] if top else None
+
+    def longest_gap(self):
+        """Return the longest inactive streak as (first day, last day, days), None if there is none."""
+        top = self.top_gaps(1)
+        return top[0] if top else None
+
+    def streaks_per_year(self) -> pd.Series:
+        """Return the longest active streak inside each year, in days."""
+        if not len(self.days):
+            return pd.Series([], dtype=np.int64)
+        years = self.days.astype("datetime64[D]").astype("datetime64[Y]")
+        years = years.astype(np.int64) + 1970
+        # Streaks crossing new year are split between the two years
+        new_year = np.flatnonzero(np.diff(years)) + 1
+        starts = np.union1d(self.run_starts, new_year)
+        lengths = np.diff(np.append(starts, len(self.days)))
+        return pd.Series(lengths).groupby(years[starts]).max()
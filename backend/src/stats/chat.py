@@ -0,0 +1,233 @@
+"""
+Aggregates of a chat computed once and shared by the messages and analytics of the PDF.
+"""
+
+from datetime import date
+
+import pandas as pd
+
+from src.stats.calendar import Calendar, interval_counts, to_timestamp
+from src.stats.cube import SLOTS, SLOT_SECONDS, CountCube
+from src.stats.emojis import EmojiCounts
+from src.stats.graph import MetricGraph, metric
+from src.stats.phrases import PhraseCounts
+from src.stats.replies import Replies
+from src.stats.words import Corpus
+
+MEDIA_OMITTED = "<Media omessi>"  # Android placeholder of a media sent in the chat
+
+
+class ChatStats(MetricGraph):
+    """Grouped, vectorized aggregates of a chat DataFrame.
+
+    Every aggregate is a node of a metric graph: it is computed on first
+    use, after the aggregates it is built from, and cached, so asking the
+    same question from several plots, messages and the analytics costs a
+    single pass over the chat. ChatStats.dependencies() describes the graph
+    and timings the cost of what a seed asked for.
+    Ties are broken by the earliest date (or weekday, year, ...)."""
+
+    def __init__(self, df: pd.DataFrame, media_count: int = None):
+        """
+        :param df: chat DataFrame with day, seconds, who, message
+        :param media_count: number of media files sent, when known from the archive
+        """
+        super().__init__()
+        self.df = df
+        self.media_count = media_count
+
+    @metric()
+    def total(self) -> int:
+        """Number of messages."""
+        return len(self.df)
+
+    @metric()
+    def first_day(self) -> pd.Timestamp:
+        """Date of the first message, None if the chat is empty."""
+        return to_timestamp(self.df.day.iloc[0]) if len(self.df) else None
+
+    @metric()
+    def cube(self) -> CountCube:
+        """Message counts by sender, day and half-hour slot, the source of every count below."""
+        return CountCube(self.df)
+
+    @metric("cube")
+    def day_counts(self) -> pd.Series:
+        """Messages per active day, indexed by date in chronological order."""
+        return self.cube.by_day()
+
+    @metric("cube")
+    def calendar(self) -> Calendar:
+        """Active days of the chat, for active and inactive streaks."""
+        return Calendar(self.cube.day)
+
+    @metric()
+    def replies(self) -> Replies:
+        """Gaps between consecutive messages, for response times and openers."""
+        return Replies(self.df)
+
+    @metric("replies")
+    def response_percentiles(self) -> pd.DataFrame:
+        """Response time percentiles in seconds, per (who was answered, who answered) pair."""
+        return self.replies.percentiles()
+
+    @metric("replies")
+    def sessions(self) -> pd.DataFrame:
+        """Conversations of the chat, split by an hour of silence."""
+        return self.replies.sessions()
+
+    @metric("day_counts")
+    def active_days(self) -> int:
+        """Number of days with at least one message."""
+        return len(self.day_counts)
+
+    @metric("day_counts")
+    def year_counts(self) -> pd.Series:
+        """Messages per year."""
+        return self.day_counts.groupby(self.day_counts.index.year).sum()
+
+    @metric("day_counts")
+    def month_counts(self) -> pd.Series:
+        """Messages per month, indexed by monthly periods."""
+        return self.day_counts.groupby(self.day_counts.index.to_period("M")).sum()
+
+    @metric("cube")
+    def weekday_counts(self) -> pd.Series:
+        """Messages per weekday, from 0 (Monday) to 6 (Sunday)."""
+        return pd.Series(self.cube.by_weekday())
+
+    @metric("words_per_message", "emojis")
+    def participants(self) -> pd.DataFrame:
+        """Per sender totals (messages, words, emojis, media, first and last seen, active days).
+
+        Computed with a single groupby, most active sender first (earliest on ties)."""
+        df = self.df.assign(
+            words=self.words_per_message,
+            emojis=self.emojis.per_message,
+            media=self.df.message == MEDIA_OMITTED,
+        )
+        table = df.groupby("who", sort=False, observed=True).agg(
+            messages=("day", "size"),
+            words=("words", "sum"),
+            emojis=("emojis", "sum"),
+            media=("media", "sum"),
+            first_seen=("day", "min"),
+            last_seen=("day", "max"),
+            active_days=("day", "nunique"),
+        )
+        table = table[table.index != "info"]
+        for col in ("first_seen", "last_seen"):
+            table[col] = pd.to_datetime(table[col].astype("int64"), unit="D")
+        return table.sort_values("messages", ascending=False, kind="stable")
+
+    @metric("cube")
+    def sender_counts(self) -> pd.Series:
+        """Messages per sender (info excluded), most active first (earliest on ties)."""
+        counts = self.cube.by_sender().rename("messages").rename_axis("who")
+        counts = counts[counts.index != "info"]
+        return counts.sort_values(ascending=False, kind="stable")
+
+    @metric("cube")
+    def slot_counts(self) -> pd.Series:
+        """Messages per half-hour slot of the day, indexed by the start of the slot."""
+        starts = pd.timedelta_range(start=0, periods=SLOTS, freq=f"{SLOT_SECONDS}s")
+        return pd.Series(self.cube.by_slot(), index=starts)
+
+    @metric()
+    def corpus(self) -> Corpus:
+        """Words of the chat, split once for word counts, swears and lengths."""
+        return Corpus(self.df)
+
+    @metric()
+    def emojis(self) -> EmojiCounts:
+        """Emojis of the chat, found with one scan for every emoji plot and the analytics."""
+        return EmojiCounts(self.df)
+
+    @metric()
+    def phrases(self) -> PhraseCounts:
+        """Swears, laughs, love words and greetings, found with one scan for every lexicon."""
+        return PhraseCounts(self.df)
+
+    @metric("corpus")
+    def words_per_message(self) -> pd.Series:
+        """Number of words of every message."""
+        return self.corpus.words_per_message
+
+    @metric()
+    def files_sent(self) -> int:
+        """Number of media files sent, from the archive or the omitted media placeholders.
+
+        Archives exported without media hold none, so only a positive count
+        of the archive replaces the placeholders."""
+        if self.media_count:
+            return self.media_count
+        return int((self.df.message == MEDIA_OMITTED).sum())
+
+    def message_counts(
+        self, interval: str = "day", until_last_message: bool = False
+    ) -> list:
+        """Return the messages per interval from the first message to today.
+
+        :param interval: "day", "week", "month" or "year"
+        :param until_last_message: end the range at the last message instead of today
+        :return: list of tuples (str of the interval start, count), see interval_counts"""
+        if not self.total:
+            return []
+        last = self.day_counts.index[-1] if until_last_message else date.today()
+        return self.compute(
+            f"message_counts[{interval}, {until_last_message}]",
+            lambda: interval_counts(
+                self.day_counts, self.day_counts.index[0], last, interval
+            ),
+            ("day_counts",),
+        )
+
+    def top_words(self, max_words: int = 100, who: str = None) -> list:
+        """Return the most used words (stopwords excluded) as (word, count)."""
+        return self.compute(
+            f"top_words[{max_words}, {who}]",
+            lambda: self.corpus.most_used(max_words, who),
+            ("corpus",),
+        )
+
+    def top_words_error(self, max_words: int = 100, who: str = None) -> int:
+        """Return how much the counts of top_words may be too high, 0 unless sketched."""
+        return self.compute(
+            f"top_words_error[{max_words}, {who}]",
+            lambda: self.corpus.error_bound(max_words, who),
+            ("corpus",),
+        )
+
+    def top_emojis(
+        self, max_emojis: int = 15, who: str = None, labels: bool = False
+    ) -> list:
+        """Return the most used emojis as (emoji, count), as plot labels if asked."""
+        return self.compute(
+            f"top_emojis[{max_emojis}, {who}, {labels}]",
+            lambda: self.emojis.most_used(max_emojis, who, labels),
+            ("emojis",),
+        )
+
+    def most_active_day(self) -> tuple:
+        """Return the day with most messages and how many there were."""
+        return self.day_counts.idxmax(), int(self.day_counts.max())
+
+    def most_active_year(self) -> tuple:
+        """Return the year with most messages and how many there were."""
+        return int(self.year_counts.idxmax()), int(self.year_counts.max())
+
+    def most_active_month(self) -> tuple:
+        """Return the month (as a Period) with most messages and how many there were."""
+        return self.month_counts.idxmax(), int(self.month_counts.max())
+
+    def most_active_weekday(self) -> tuple:
+        """Return the weekday (0 is Monday) with most messages and how many there were."""
+        return int(self.weekday_counts.idxmax()), int(self.weekday_counts.max())
+
+    def most_active_person(self) -> tuple:
+        """Return the sender with most messages and how many they wrote."""
+        return self.sender_counts.index[0], int(self.sender_counts.iloc[0])
+
+    def avg_words_per_message(self) -> float:
+        """Return the average number of words in a message."""
+        return round(self.words_per_message.sum() / self.total, 2)
@@ -0,0 +1,77 @@
+"""
+Message counts by sender, day and half-hour slot of the day.
+"""
+
+import numpy as np
+import pandas as pd
+
+SLOT_SECONDS = 30 * 60
+SLOTS = 24 * 60 * 60 // SLOT_SECONDS
+EPOCH_WEEKDAY = 3  # 01/01/1970 was a Thursday
+
+
+class CountCube:
+    """Sparse sender × day × half-hour slot cube of message counts.
+
+    Only the non empty cells are stored, sorted by sender, day and slot, so
+    every time based count is a bincount over at most one entry per message
+    (and usually far fewer) instead of a scan of the chat."""
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        :param df: chat DataFrame with day, seconds, who, message
+        """
+        codes, self.senders = pd.factorize(df.who)  # Senders in order of appearance
+        days = df.day.to_numpy().astype(np.int64)
+        slots = df.seconds.to_numpy().astype(np.int64) // SLOT_SECONDS
+        self.first_day = int(days.min()) if len(days) else 0
+        span = int(days.max()) - self.first_day + 1 if len(days) else 1
+
+        # One groupby for the whole chat: count the distinct combined keys
+        keys = (codes.astype(np.int64) * span + (days - self.first_day)) * SLOTS + slots
+        keys, counts = np.unique(keys, return_counts=True)
+        self.sender = (keys // (span * SLOTS)).astype(np.int32)
+        self.day = (keys // SLOTS % span + self.first_day).astype(np.int32)
+        self.slot = (keys % SLOTS).astype(np.int8)
+        self.count = counts.astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.count)
+
+    def _cells(self, who: str = None) -> tuple:
+        """Return day, slot and count of the cells, only of a sender if given."""
+        if who is None:
+            return self.day, self.slot, self.count
+        if who not in self.senders:
+            return self.day[:0], self.slot[:0], self.count[:0]
+        mask = self.sender == self.senders.get_loc(who)
+        return self.day[mask], self.slot[mask], self.count[mask]
+
+    def by_slot(self, who: str = None) -> np.ndarray:
+        """Return the number of messages in each half-hour slot, from 00:00 to 23:30."""
+        _, slot, count = self._cells(who)
+        return np.bincount(slot, weights=count, minlength=SLOTS).astype(np.int64)
+
+    def by_weekday(self, who: str = None) -> np.ndarray:
+        """Return the number of messages sent on each weekday, from Monday to Sunday."""
+        day, _, count = self._cells(who)
+        weekday = (day + EPOCH_WEEKDAY) % 7
+        return np.bincount(weekday, weights=count, minlength=7).astype(np.int64)
+
+    def by_sender(self) -> pd.Series:
+        """Return the number of messages of each sender."""
+        counts = np.bincount(
+            self.sender, weights=self.count, minlength=len(self.senders)
+        )
+        return pd.Series(counts.astype(np.int64), index=self.senders)
+
+    def by_day(self, who: str = None) -> pd.Series:
+        """Return the number of messages of each active day, indexed by date."""
+        day, _, count = self._cells(who)
+        if len(day) == 0:
+            return pd.Series([], index=pd.DatetimeIndex([]), dtype=np.int64)
+        counts = np.bincount(day - self.first_day, weights=count).astype(np.int64)
+        active = np.flatnonzero(counts)
+        dates = (active + self.first_day).astype("datetime64[D]")
+        dates = dates.astype("datetime64[ns]")
+        return pd.Series(counts[active], index=pd.DatetimeIndex(dates))
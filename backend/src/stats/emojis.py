@@ -0,0 +1,150 @@
+"""
+Emoji counts of a chat, found with one scan of the messages.
+"""
+
+import pandas as pd
+from emoji import EMOJI_DATA, STATUS
+
+from src.parser.normalize import FONT_UNFRIENDLY
+
+ZWJ = "\u200d"
+# Regional indicators (pairs of them are flags) and tags (subdivision flags)
+REGIONAL_INDICATORS = ("\U0001f1e6", "\U0001f1ff")
+TAGS = "".join(map(chr, range(0xE0020, 0xE0080)))
+LABEL_TABLE = str.maketrans("", "", FONT_UNFRIENDLY + TAGS)
+FLAG_LABEL = "\U0001f3f3"  # White flag
+
+
+def canonical_forms() -> dict:
+    """Map every emoji of the emoji package to its fully qualified form.
+
+    Variants with or without the variation selector ("❤" and "❤️") become
+    the same emoji; components (skin tones, hair styles) sent on their own
+    map to None."""
+    qualified = {
+        data["en"]: emoji
+        for emoji, data in EMOJI_DATA.items()
+        if data["status"] == STATUS["fully_qualified"]
+    }
+    return {
+        emoji: None
+        if data["status"] == STATUS["component"]
+        else qualified.get(data["en"], emoji)
+        for emoji, data in EMOJI_DATA.items()
+    }
+
+
+def build_trie(forms: dict) -> dict:
+    """Arrange emojis in a trie of nested dicts, one level per codepoint.
+
+    The node where an emoji ends stores its canonical form under the "" key.
+
+    :param forms: dictionary mapping every emoji to its canonical form
+    :return: root of the trie"""
+    trie = {}
+    for emoji, form in forms.items():
+        node = trie
+        for char in emoji:
+            node = node.setdefault(char, {})
+        node[""] = form
+    return trie
+
+
+# Built once per process: every emoji, ZWJ sequence, flag and keycap
+EMOJI_TRIE = build_trie(canonical_forms())
+
+
+def find_emojis(txt: str) -> list:
+    """Return the emojis of a text, multi codepoint sequences as a single emoji.
+
+    At each position the longest emoji is taken, and every variant of an
+    emoji is returned in its fully qualified form.
+
+    :param txt: text to scan
+    :return: list of emojis in order of appearance"""
+    if txt.isascii():
+        return []
+    found = []
+    skip = 0
+    for start, char in enumerate(txt):
+        if start < skip or char not in EMOJI_TRIE:
+            continue
+        node, pos, end = EMOJI_TRIE[char], start + 1, None
+        while True:
+            if "" in node:
+                form, end = node[""], pos
+            if pos == len(txt) or txt[pos] not in node:
+                break
+            node = node[txt[pos]]
+            pos += 1
+        if end is not None:
+            skip = end
+            if form is not None:
+                found.append(form)
+    return found
+
+
+def plot_label(emoji: str) -> str:
+    """Return an emoji as the plot fonts can draw it.
+
+    Counts keep whole sequences, labels don't: modifiers the fonts can't
+    render are removed, a ZWJ sequence is shown as its first emoji and a
+    country flag as a white flag.
+
+    :param emoji: emoji as returned by find_emojis
+    :return: label of the emoji"""
+    first, last = REGIONAL_INDICATORS
+    if all(first <= char <= last for char in emoji):
+        return FLAG_LABEL
+    return emoji.split(ZWJ)[0].translate(LABEL_TABLE) or emoji
+
+
+class EmojiCounts:
+    """Emojis of every message of a chat, found once and counted per sender."""
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        :param df: chat DataFrame with who and message
+        """
+        found = pd.Series(
+            [find_emojis(message) for message in df.message.tolist()], index=df.index
+        ).explode()
+        found = found[found.notna()]
+        # Emojis of every message, for the participants table
+        self.per_message = found.groupby(level=0).size().reindex(df.index, fill_value=0)
+        table = pd.DataFrame(
+            {"who": df.who.loc[found.index].to_numpy(), "emoji": found.to_numpy()}
+        )
+        # Emojis in order of first use, so ties keep it after sorting
+        self.by_sender = table.groupby(["who", "emoji"], sort=False).size()
+        self.total = table.emoji.value_counts(sort=False).sort_values(
+            ascending=False, kind="stable"
+        )
+
+    def counts(self, who: str = None) -> pd.Series:
+        """Return how many times each emoji was sent, most used first.
+
+        :param who: count only the emojis of a sender
+        :return: Series of counts indexed by emoji"""
+        if who is None:
+            return self.total
+        if who not in self.by_sender.index.get_level_values(0):
+            return self.total.iloc[:0]
+        counts = self.by_sender.xs(who, level="who")
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def most_used(
+        self, max_emojis: int = 15, who: str = None, labels: bool = False
+    ) -> list:
+        """Return the most used emojis.
+
+        :param max_emojis: maximum number of emojis to return
+        :param who: count only the emojis of a sender
+        :param labels: return plot labels, merging the emojis with the same one (see plot_label)
+        :return: list of tuples (emoji, count)"""
+        counts = self.counts(who)
+        if labels:
+            counts = counts.groupby(counts.index.map(plot_label), sort=False).sum()
+            counts = counts.sort_values(ascending=False, kind="stable")
+        counts = counts.head(max_emojis)
+        return [(emoji, int(count)) for emoji, count in counts.items()]
@@ -0,0 +1,80 @@
+"""
+Lazy metric graph: aggregates computed on demand, at most once, with their cost.
+"""
+
+import time
+
+
+class MetricGraph:
+    """Base class of objects whose aggregates are nodes of a dependency graph.
+
+    A node is computed the first time a consumer asks for it, after the
+    nodes it depends on, and then kept. The time spent computing each node,
+    its dependencies excluded, is recorded in timings."""
+
+    def __init__(self):
+        self.timings = {}
+        self._values = {}
+        self._running = []  # Time spent in nested nodes, one entry per node being computed
+
+    def compute(self, name: str, func, depends: tuple = ()):
+        """Return the value of a node, computing it (and its dependencies) if needed.
+
+        :param name: unique name of the node, e.g. "daily_counts[week]" for parametric nodes
+        :param func: function without arguments computing the node
+        :param depends: names of the metric attributes the node reads
+        :return: value of the node"""
+        if name in self._values:
+            return self._values[name]
+        for dependency in depends:
+            getattr(self, dependency)
+        self._running.append(0.0)
+        start = time.perf_counter()
+        try:
+            value = func()
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._running.pop()
+            if self._running:
+                self._running[-1] += elapsed
+        self.timings[name] = elapsed - nested
+        self._values[name] = value
+        return value
+
+    @classmethod
+    def dependencies(cls) -> dict:
+        """Return the declared dependencies of every metric of the class."""
+        return {
+            name: node.depends
+            for klass in reversed(cls.__mro__)
+            for name, node in vars(klass).items()
+            if isinstance(node, metric)
+        }
+
+    def timing_report(self) -> str:
+        """Return the computed nodes and their time, slowest first."""
+        ordered = sorted(self.timings.items(), key=lambda item: item[1], reverse=True)
+        return ", ".join(f"{name} {seconds:.3f}s" for name, seconds in ordered)
+
+
+class metric:
+    """Declare a method of a MetricGraph as a lazily computed node (read like a property).
+
+    :param depends: names of the metrics the node reads, computed before it"""
+
+    def __init__(self, *depends):
+        self.depends = depends
+        self.func = None
+
+    def __call__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+        return self
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return obj.compute(self.name, lambda: self.func(obj), self.depends)
@@ -0,0 +1,151 @@
+"""
+Phrase lexicon counts of a chat (swears, laughs, ...), found with one scan of the messages.
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from src.lexicon import PHRASES
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over the phrases of several lexicons.
+
+    The automaton is compiled once into a table of transitions (missing
+    characters go back to the root), so a text is matched against every
+    phrase of every lexicon in a single pass, one lookup per character.
+
+    Phrases match whole words only ("culo" isn't found in "vaffanculo"),
+    and a phrase ending with * may go on with more letters ("ahah*" matches
+    "ahahahah"). Matches of the same lexicon don't overlap: the leftmost
+    one is kept, the longest of those starting together ("ciao a tutti" is
+    one greeting, not "ciao")."""
+
+    def __init__(self, lexicons: dict):
+        """
+        :param lexicons: dictionary mapping every category to its list of phrases
+        """
+        self.categories = list(lexicons)
+        goto = [{}]  # Trie of the phrases, one dict of children per state
+        outputs = [[]]  # (length, category index, open ended) of the phrases ending there
+        for category, phrases in enumerate(lexicons.values()):
+            for phrase in phrases:
+                open_ended = phrase.endswith("*")
+                phrase = phrase.rstrip("*").lower()
+                if not phrase:
+                    continue
+                state = 0
+                for char in phrase:
+                    if char not in goto[state]:
+                        goto[state][char] = len(goto)
+                        goto.append({})
+                        outputs.append([])
+                    state = goto[state][char]
+                outputs[state].append((len(phrase), category, open_ended))
+
+        # Breadth first, so the fail state of every state is already complete
+        fail = [0] * len(goto)
+        self.transitions = [dict(goto[0])] + [None] * (len(goto) - 1)
+        self.outputs = [[]] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            self.transitions[state] = {**self.transitions[fail[state]], **goto[state]}
+            # Longest phrase first, the ones of the fail state are all shorter
+            self.outputs[state] = sorted(outputs[state], reverse=True)
+            self.outputs[state] += self.outputs[fail[state]]
+            for char, child in goto[state].items():
+                fail[child] = self.transitions[fail[state]].get(char, 0)
+                queue.append(child)
+
+    def find(self, txt: str):
+        """Yield start, end and category index of every phrase in a lowercase text.
+
+        :param txt: lowercase text to scan
+        :return: generator of tuples (start, end, category index), sorted by start"""
+        transitions, outputs = self.transitions, self.outputs
+        found = []
+        state = 0
+        for end, char in enumerate(txt, 1):
+            state = transitions[state].get(char, 0)
+            if not outputs[state]:
+                continue
+            for length, category, open_ended in outputs[state]:
+                start = end - length
+                if start and txt[start - 1].isalnum():
+                    continue
+                stop = end
+                if open_ended:
+                    while stop < len(txt) and txt[stop].isalnum():
+                        stop += 1
+                elif stop < len(txt) and txt[stop].isalnum():
+                    continue
+                found.append((start, -stop, category))
+
+        # Leftmost first and, among the ones starting together, longest first
+        found.sort()
+        last_end = [0] * len(self.categories)
+        for start, stop, category in found:
+            if start < last_end[category]:
+                continue
+            last_end[category] = -stop
+            yield start, -stop, category
+
+
+# Compiled once per process from every lexicon of src.lexicon
+PHRASE_MATCHER = PhraseMatcher(PHRASES)
+
+
+class PhraseCounts:
+    """Matches of every phrase lexicon, per sender, from one scan of the chat."""
+
+    def __init__(self, df: pd.DataFrame, matcher: PhraseMatcher = PHRASE_MATCHER):
+        """
+        :param df: chat DataFrame with who and message
+        :param matcher: automaton of the lexicons to count
+        """
+        messages = [message.lower() for message in df.message.tolist()]
+        # Scan the whole chat at once, newlines keep the messages apart
+        offsets = np.cumsum([0] + [len(message) + 1 for message in messages])
+        found = list(matcher.find("\n".join(messages)))
+        starts = np.array([start for start, _, _ in found], dtype=np.int64)
+        message = np.searchsorted(offsets, starts, side="right") - 1
+        table = pd.DataFrame(
+            {
+                "who": df.who.to_numpy()[message],
+                "category": [matcher.categories[i] for _, _, i in found],
+            }
+        )
+        self.by_sender = (
+            table.groupby(["who", "category"], sort=False)
+            .size()
+            .unstack(fill_value=0)
+            .reindex(columns=matcher.categories, fill_value=0)
+        )
+        self.totals = self.by_sender.sum().astype(np.int64)
+
+    def count(self, category: str, who: str = None) -> int:
+        """Return how many phrases of a lexicon were sent.
+
+        :param category: lexicon, e.g. "swears" or "laughs"
+        :param who: count only the phrases of a sender
+        :return: number of matches"""
+        if who is None:
+            return int(self.totals[category])
+        if who not in self.by_sender.index:
+            return 0
+        return int(self.by_sender.loc[who, category])
+
+    def top_sender(self, category: str) -> tuple:
+        """Return who sent the most phrases of a lexicon (earliest sender on ties).
+
+        :param category: lexicon, e.g. "swears" or "laughs"
+        :return: tuple (sender, count), None if nobody sent any"""
+        counts = self.by_sender[category]
+        counts = counts[(counts.index != "info") & (counts > 0)]
+        if counts.empty:
+            return None
+        who = counts.idxmax()
+        return who, int(counts[who])
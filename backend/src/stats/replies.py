@@ -0,0 +1,103 @@
+"""
+Gaps between consecutive messages: response times, conversation openers and sessions.
+"""
+
+import numpy as np
+import pandas as pd
+
+NS_PER_SECOND = 10**9
+NS_PER_DAY = 24 * 60 * 60 * NS_PER_SECOND
+SESSION_IDLE = 60 * 60  # Seconds of silence after which a new conversation starts
+PERCENTILES = (25, 50, 75, 90)
+
+
+class Replies:
+    """Time gaps between consecutive messages of a chat, as int64 nanoseconds.
+
+    A response is a message following one of another sender, its response
+    time the gap since that message."""
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        :param df: chat DataFrame with day, seconds, who, message in chronological order
+        """
+        days = df.day.to_numpy().astype(np.int64)
+        seconds = df.seconds.to_numpy().astype(np.int64)
+        self.timestamps = days * NS_PER_DAY + seconds * NS_PER_SECOND
+        self.sender, self.senders = pd.factorize(df.who)
+        self.gaps = np.diff(self.timestamps)  # gaps[i] is the wait before message i + 1
+        self.is_response = self.sender[1:] != self.sender[:-1]
+
+    def __len__(self) -> int:
+        return len(self.gaps)
+
+    def response_times(self) -> pd.DataFrame:
+        """Return every response with who was answered, who answered and the seconds it took."""
+        previous, replier = self.sender[:-1], self.sender[1:]
+        mask = self.is_response
+        return pd.DataFrame(
+            {
+                "prev_who": self.senders[previous[mask]],
+                "who": self.senders[replier[mask]],
+                "seconds": self.gaps[mask] // NS_PER_SECOND,
+            }
+        )
+
+    def percentiles(self, q: tuple = PERCENTILES, pairs: bool = True) -> pd.DataFrame:
+        """Return percentiles of the response times of each sender pair (or sender).
+
+        :param q: percentiles to compute, between 0 and 100
+        :param pairs: group by who was answered and who answered, not who answered only
+        :return: DataFrame with a column of seconds per percentile and a count column,
+            indexed by (prev_who, who) or by who"""
+        times = self.response_times()
+        keys = ["prev_who", "who"] if pairs else "who"
+        grouped = times.groupby(keys, sort=False).seconds
+        out = pd.DataFrame({f"p{p}": grouped.quantile(p / 100) for p in q})
+        out["count"] = grouped.size()
+        return out
+
+    def openers(self) -> pd.Series:
+        """Return who wrote the first message of each active day, indexed by day."""
+        days = self.timestamps // NS_PER_DAY
+        first = np.flatnonzero(np.diff(days, prepend=days[:1] - 1))
+        return pd.Series(
+            self.senders[self.sender[first]],
+            index=days[first].astype("datetime64[D]"),
+        )
+
+    def opener_counts(self) -> pd.Series:
+        """Return how many days each sender wrote first, most first (earliest opener on ties)."""
+        return self.openers().value_counts(sort=False).sort_values(
+            ascending=False, kind="stable"
+        )
+
+    def sessions(self, idle: int = SESSION_IDLE) -> pd.DataFrame:
+        """Split the chat in conversations separated by at least idle seconds of silence.
+
+        :param idle: seconds without messages that end a conversation
+        :return: DataFrame with first and last message position, opener and length of each conversation"""
+        if not len(self.timestamps):
+            return pd.DataFrame(columns=["start", "end", "opener", "messages"])
+        breaks = np.flatnonzero(self.gaps >= idle * NS_PER_SECOND) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.append(starts[1:], len(self.timestamps)) - 1
+        return pd.DataFrame(
+            {
+                "start": starts,
+                "end": ends,
+                "opener": self.senders[self.sender[starts]],
+                "messages": ends - starts + 1,
+            }
+        )
+
+    def central_mean(self, first: int, last: int, denom: int) -> pd.Timedelta:
+        """Return half the sum of gaps[first:last] divided by denom, the typical wait of the PDF.
+
+        :param first: position of the first gap summed
+        :param last: position after the last gap summed
+        :param denom: divisor of the sum
+        :return: typical wait as a Timedelta"""
+        if denom <= 0:
+            return pd.Timedelta(0)
+        return pd.Timedelta(int(self.gaps[first:last].sum())) / denom / 2
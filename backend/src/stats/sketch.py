@@ -0,0 +1,80 @@
+"""
+Bounded memory top-k counting (Space-Saving), an alternative to exact word counts.
+"""
+
+import os
+import heapq
+
+# "exact" counts every distinct word, "sketch" keeps at most TOP_K_CAPACITY counters
+TOP_K_MODE = os.getenv("TOP_K_MODE", "exact")
+TOP_K_CAPACITY = int(os.getenv("TOP_K_CAPACITY", 10000))
+
+
+class SpaceSaving:
+    """Space-Saving sketch of the most frequent items of a stream.
+
+    At most capacity items are tracked. When a new item arrives and the
+    sketch is full, it replaces the item with the smallest count and
+    inherits that count as its error, so every reported count is at most
+    error above the true one, and any item more frequent than
+    total / capacity is always in the sketch."""
+
+    def __init__(self, capacity: int = TOP_K_CAPACITY):
+        """
+        :param capacity: maximum number of items tracked
+        """
+        if capacity < 1:
+            raise ValueError("The capacity of a sketch must be at least 1")
+        self.capacity = capacity
+        self.counts = {}  # item -> [count, error]
+        self.total = 0
+        self._heap = []  # (count, item), stale entries are skipped when popped
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def update(self, item, weight: int = 1) -> None:
+        """Count weight occurrences of an item."""
+        self.total += weight
+        entry = self.counts.get(item)
+        if entry is not None:
+            entry[0] += weight
+        elif len(self.counts) < self.capacity:
+            entry = self.counts[item] = [weight, 0]
+        else:
+            smallest, evicted = self._pop_smallest()
+            del self.counts[evicted]
+            entry = self.counts[item] = [smallest + weight, smallest]
+        heapq.heappush(self._heap, (entry[0], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, item) for item, (count, _) in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def update_counts(self, counts) -> None:
+        """Count the items of (item, occurrences) pairs, e.g. a chunk already counted exactly."""
+        for item, weight in counts:
+            self.update(item, int(weight))
+
+    def _pop_smallest(self) -> tuple:
+        """Remove and return the (count, item) heap entry of the least counted item."""
+        while True:
+            count, item = heapq.heappop(self._heap)
+            entry = self.counts.get(item)
+            if entry is not None and entry[0] == count:
+                return count, item
+
+    def error_bound(self) -> int:
+        """Return the maximum overestimation of any count (0 until the sketch is full)."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counts.values())
+
+    def top(self, n: int = None) -> list:
+        """Return the n most counted items as (item, count, error), most counted first.
+
+        The true count of an item is between count - error and count.
+
+        :param n: number of items to return, all of them if None
+        :return: list of tuples (item, count, error)"""
+        items = sorted(self.counts.items(), key=lambda entry: entry[1][0], reverse=True)
+        return [(item, count, error) for item, (count, error) in items[:n]]
@@ -0,0 +1,111 @@
+"""
+Word counts of a chat, tokenized once and shared by every word based statistic.
+"""
+
+from string import punctuation
+
+import pandas as pd
+
+from src.lexicon import STOP_WORDS
+from src.stats.sketch import TOP_K_CAPACITY, TOP_K_MODE, SpaceSaving
+
+PUNCTUATION_TABLE = str.maketrans("", "", punctuation)
+MIN_WORD_LENGTH = 3
+
+
+class Corpus:
+    """Words of every message of a chat, split once with vectorized string operations.
+
+    Words are split on whitespace, stripped of punctuation and lowercased.
+    Words shorter than MIN_WORD_LENGTH, numbers and stopwords aren't
+    counted.
+
+    In "sketch" mode word counts are estimated with a Space-Saving sketch,
+    whose memory doesn't grow with the vocabulary, instead of counting
+    every distinct word."""
+
+    def __init__(self, df: pd.DataFrame, mode: str = TOP_K_MODE):
+        """
+        :param df: chat DataFrame with who and message
+        :param mode: "exact" or "sketch" word counts
+        """
+        if mode not in ("exact", "sketch"):
+            raise ValueError(f"Unknown top-k mode {mode!r}")
+        self.mode = mode
+        raw = df.message.str.split().explode()
+        raw = raw[raw.notna()]
+        # Words of each message, punctuation included, like str.split counts them
+        self.words_per_message = (
+            raw.groupby(level=0).size().reindex(df.index, fill_value=0)
+        )
+        words = raw.str.translate(PUNCTUATION_TABLE).str.lower()
+        valid = (
+            (words.str.len() >= MIN_WORD_LENGTH)
+            & ~words.str.isdigit()
+            & ~words.isin(STOP_WORDS)
+        )
+        self.words = words[valid].astype(object)
+        self.who = df.who.loc[self.words.index].to_numpy()
+        self._counts = {}
+        self._errors = {}
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def counts(self, who: str = None) -> pd.Series:
+        """Return how many times each word was written, stopwords excluded, most used first.
+
+        Ties keep the order in which the words first appear. In sketch mode
+        only the most used words are returned and their counts may be too
+        high by up to the matching entry of errors.
+
+        :param who: count only the words of a sender
+        :return: Series of counts indexed by word"""
+        if who not in self._counts:
+            words = self.words if who is None else self.words[self.who == who]
+            if self.mode == "sketch":
+                counts, errors = self._sketch_counts(words)
+            else:
+                counts = words.value_counts(sort=False)
+                counts = counts.sort_values(ascending=False, kind="stable")
+                errors = pd.Series(0, index=counts.index, dtype="int64")
+            self._counts[who], self._errors[who] = counts, errors
+        return self._counts[who]
+
+    def errors(self, who: str = None) -> pd.Series:
+        """Return the maximum overestimation of each count of counts (all 0 in exact mode)."""
+        self.counts(who)
+        return self._errors[who]
+
+    @staticmethod
+    def _sketch_counts(words: pd.Series) -> tuple:
+        """Estimate the word counts with a sketch fed one word at a time.
+
+        Words are never counted exactly, so at most TOP_K_CAPACITY counters
+        are held whatever the vocabulary."""
+        sketch = SpaceSaving(TOP_K_CAPACITY)
+        for word in words:
+            sketch.update(word)
+        top = sketch.top()
+        index = [word for word, _, _ in top]
+        counts = pd.Series([count for _, count, _ in top], index=index, dtype="int64")
+        errors = pd.Series([error for _, _, error in top], index=index, dtype="int64")
+        return counts, errors
+
+    def error_bound(self, max_words: int = 100, who: str = None) -> int:
+        """Return how much the top counts may be too high (0 in exact mode).
+
+        :param max_words: number of most used words considered
+        :param who: count only the words of a sender
+        :return: maximum overestimation of their counts"""
+        errors = self.errors(who).head(max_words)
+        return int(errors.max()) if len(errors) else 0
+
+    def most_used(self, max_words: int = 100, who: str = None) -> list:
+        """Return the most used words, stopwords excluded.
+
+        :param max_words: maximum number of words to return
+        :param who: count only the words of a sender
+        :return: list of tuples (word, count)"""
+        counts = self.counts(who).head(max_words)
+        return [(word, int(count)) for word, count in counts.items()]
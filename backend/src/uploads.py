@@ -0,0 +1,143 @@
+"""Resumable chunked uploads of big chat exports."""
+
+import io
+import os
+import json
+import time
+import uuid
+import threading
+from pathlib import Path
+
+from src.parser.archive import is_zip
+from src.parser.compressed import compression
+from src.parser.formats import sniff_buffer
+
+# Received bytes are kept in UPLOAD_DIR until the upload is finalized or expires
+UPLOAD_DIR = os.getenv(
+    "UPLOAD_DIR",
+    "/tmp/uploads"
+    if os.getenv("RENDER")
+    else str(Path(__file__).resolve().parent.parent / "uploads"),
+)
+UPLOAD_TTL = int(os.getenv("UPLOAD_TTL", 24 * 60 * 60))  # Seconds since the last chunk
+MAX_CHUNK_SIZE = int(os.getenv("UPLOAD_MAX_CHUNK_SIZE", 16 * 1024 * 1024))
+MAX_UPLOAD_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", 2 * 1024 * 1024 * 1024))
+
+_lock = threading.Lock()
+
+
+def _paths(upload_id: str) -> tuple:
+    """Return the data and metadata paths of an upload.
+
+    :raises KeyError: if upload_id isn't a valid upload id"""
+    try:
+        upload_id = str(uuid.UUID(upload_id))
+    except ValueError:
+        raise KeyError(upload_id)
+    base = os.path.join(UPLOAD_DIR, upload_id)
+    return base + ".part", base + ".json"
+
+
+def create(filename: str, size: int = None) -> dict:
+    """Start a new upload.
+
+    :param filename: name of the uploaded file
+    :param size: total size in bytes, if known
+    :return: status of the upload (see status)"""
+    if size is not None and not 0 < size <= MAX_UPLOAD_SIZE:
+        raise ValueError(f"Upload size must be between 1 and {MAX_UPLOAD_SIZE} bytes")
+    cleanup()
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    upload_id = str(uuid.uuid4())
+    data_path, meta_path = _paths(upload_id)
+    open(data_path, "wb").close()
+    with open(meta_path, "w") as fp:
+        json.dump({"filename": os.path.basename(filename), "size": size}, fp)
+    return status(upload_id)
+
+
+def status(upload_id: str) -> dict:
+    """Return how much of an upload was received, to resume it.
+
+    :param upload_id: id returned by create
+    :return: dictionary with upload_id, filename, size and offset (bytes received)
+    :raises KeyError: if the upload doesn't exist"""
+    data_path, meta_path = _paths(upload_id)
+    try:
+        with open(meta_path, "r") as fp:
+            meta = json.load(fp)
+        offset = os.path.getsize(data_path)
+    except (OSError, ValueError):
+        raise KeyError(upload_id)
+    return {"upload_id": upload_id, **meta, "offset": offset}
+
+
+def prescan(head: bytes) -> None:
+    """Reject an upload whose first chunk isn't a chat export, before the rest is sent.
+
+    :param head: first bytes of the upload
+    :raises ValueError: if the chunk is neither an archive nor a chat in a known format"""
+    stream = io.BytesIO(head)
+    if is_zip(stream) or compression(stream) is not None:
+        return
+    lines = head[: head.rfind(b"\n") + 1]  # The last line may go on in the next chunk
+    if lines:
+        sniff_buffer(lines)
+
+
+def write_chunk(upload_id: str, offset: int, data: bytes) -> int:
+    """Store a chunk of an upload.
+
+    A chunk may overlap the bytes already received (e.g. it is sent again
+    after a lost response) but can't leave a gap after them.
+
+    :param upload_id: id returned by create
+    :param offset: position of the chunk in the file
+    :param data: bytes of the chunk
+    :return: bytes received so far
+    :raises KeyError: if the upload doesn't exist
+    :raises ValueError: if the chunk doesn't fit the upload"""
+    if len(data) > MAX_CHUNK_SIZE:
+        raise ValueError(f"Chunks can't be bigger than {MAX_CHUNK_SIZE} bytes")
+    with _lock:
+        current = status(upload_id)
+        size = current["size"] or MAX_UPLOAD_SIZE
+        if not 0 <= offset <= current["offset"]:
+            raise ValueError(f"Expected a chunk at offset {current['offset']}")
+        if offset + len(data) > size:
+            raise ValueError(f"The upload is {size} bytes long")
+        if offset == 0 and data:
+            prescan(data)
+        data_path, meta_path = _paths(upload_id)
+        with open(data_path, "r+b") as fp:
+            fp.seek(offset)
+            fp.write(data)
+        os.utime(meta_path)  # Last chunk, for the TTL
+        return max(current["offset"], offset + len(data))
+
+
+def part_path(upload_id: str) -> str:
+    """Return the path of the bytes received for an upload."""
+    return _paths(upload_id)[0]
+
+
+def remove(upload_id: str) -> None:
+    """Delete an upload, ignoring missing files."""
+    for file_path in _paths(upload_id):
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+
+def cleanup() -> None:
+    """Delete the uploads that received no chunk for UPLOAD_TTL seconds."""
+    if not os.path.isdir(UPLOAD_DIR):
+        return
+    now = time.time()
+    for entry in os.scandir(UPLOAD_DIR):
+        if entry.name.endswith(".json") and now - entry.stat().st_mtime > UPLOAD_TTL:
+            try:
+                remove(entry.name[: -len(".json")])
+            except KeyError:  # Not an upload
+                continue
@@ -1,36 +1,16 @@
 """Utility functions for parsing WhatsApp chat exports and analyzing message data."""
 
 import os
-import re
 import pandas as pd
 import matplotlib.pyplot as plt
 from string import punctuation
 from collections import Counter
-from datetime import date, timedelta
-import nltk
-from nltk.corpus import stopwords
-from emoji import EMOJI_DATA
 from math import pi
 
-
-def IOS_or_Android(txt: str, regexs: dict) -> str:
-    """Return from which device the file is from (Android or iPhone) by checking the text to some regexs.
-
-    :param txt: text to check
-    :param regexs: dictionary with regexs to check
-    :return: "IOS" if iPhone, "Android" if Android, "IDK" if not recognized
-    """
-    for regex in regexs["IOS"].values():
-        if re.search(regex, txt) is not None:
-            return "IOS"
-    for regex in regexs["Android"].values():
-        if re.search(regex, txt) is not None:
-            return "Android"
-        
-    if len(txt) < 50:
-        raise ValueError(f"Couldn't detect which device was used. Anonymous text:\n{txt}")
-    else:
-        raise ValueError(f"Couldn't detect which device was used. Anonymous text:\n{txt[:50]}")
+from src.parser.engine import parse_chat
+from src.parser.normalize import bubble_lines, bubble_size, normalize_sender
+from src.stats.emojis import EmojiCounts
+from src.stats.words import Corpus
 
 
 def get_data(file: str) -> list:
@@ -38,50 +18,7 @@ def get_data(file: str) -> list:
 
     :param file: path to the .txt file
     :return: list of lists with date, time, who, message"""
-    try:
-        fp = open(file, "r", encoding="utf8")
-    except UnicodeDecodeError:
-        fp = open(file, "r", encoding="latin1")
-    data = []
-    trame = fp.readline()
-    regexs = {
-        "IOS": {
-            "normal": r"\[(\d{2}\/\d{2}\/\d{2}), (\d{2}:\d{2}:\d{2})\] (.*?): (.*)$",
-            "info": r"\[(\d{2}\/\d{2}\/\d{2}), (\d{2}:\d{2}:\d{2})\] (.*)$",
-        },
-        "Android": {
-            "normal": r"(\d{2}\/\d{2}\/\d{2}), (\d{2}:\d{2}) - (.*?): (.*)$",
-            "info": r"(\d{2}\/\d{2}\/\d{2}), (\d{2}:\d{2}) - (.*)$",
-        },
-    }
-    device = IOS_or_Android(trame, regexs)
-    while trame != "":
-        norm = re.search(regexs[device]["normal"], trame)
-        info = re.search(regexs[device]["info"], trame)
-        if norm is not None or info is not None:
-            if norm is not None:
-                date = norm.group(1)
-                time = norm.group(2)
-                who = font_friendly(norm.group(3)) if font_friendly else norm.group(3)
-                message = norm.group(4)
-            else:  # Info message
-                date = info.group(1)
-                time = info.group(2)
-                who = "info"
-                message = info.group(3)
-                pass
-            if device == "Android":
-                time += ":00"
-            while message.find("‎") != -1:
-                message = message[: message.find("‎")] + message[message.find("‎") + 1 :]
-            if (
-                who != "info"
-            ):  # We can avoid adding info messages to dataframe, not used in analysis
-                data.append([date, time, who, message])
-        elif len(data) != 0:
-            data[-1][3] += "\n" + trame
-        trame = fp.readline()
-    return data
+    return parse_chat(file)
 
 
 def get_message_freq_dict(messages: pd.Series, blacklist: list = []) -> dict:
@@ -90,8 +27,7 @@ def get_message_freq_dict(messages: pd.Series, blacklist: list = []) -> dict:
     :param messages: pandas Series with messages
     :param blacklist: list of words to ignore
     :return: dictionary with words as keys and frequency as values"""
-    # blacklist = map(str.lower, blacklist)
-
+    blacklist = frozenset(blacklist)
     translator = str.maketrans("", "", punctuation)
     most_used_words = Counter()
 
@@ -184,45 +120,18 @@ def max_and_index(lst: list) -> tuple:
 
 def font_friendly(txt: str) -> str:
     """Remove bad emojis that make the PDF look bad."""
-    bad_emojis = ["️", "⃣", "🏽", "🏼", "🏾", "🏻", "🏿"]
-    new_txt = ""
-    for i in txt:
-        if i not in bad_emojis:
-            new_txt += i
-    return new_txt
+    return normalize_sender(txt)
 
 
 def check_text(txt: str, char_per_line: int = 50) -> str:
     """Check how big the message bubble needs to be (one, two, three lines)."""
-    bubble = 1
-    counter = 0
-    for i in txt:
-        if counter == char_per_line - 1 or i == "\n":
-            bubble += 1
-            if bubble == 3:
-                break
-            counter = -1
-        counter += 1
     bubble_dict = {1: "one", 2: "two", 3: "three"}
-    return bubble_dict[bubble]
+    return bubble_dict[bubble_size(txt, char_per_line)]
 
 
 def transform_text(txt: str, char_per_line: int = 50) -> str:
     """Transform string of text to fit into message bubble."""
-    new_txt = ""
-    counter = 0
-    times = 0
-    for i in txt:
-        if counter == char_per_line or i == "\n":
-            counter = -1
-            times += 1
-            if times == 3:
-                break
-            new_txt += "\n"
-        if i != "\n":
-            new_txt += i
-        counter += 1
-    return new_txt
+    return "\n".join(bubble_lines(txt, char_per_line))
 
 
 def get_data_file_path(filename):
@@ -230,50 +139,6 @@ def get_data_file_path(filename):
     return os.path.join(project_root, filename)
 
 
-def get_daily_message_counts(df: pd.DataFrame, interval: str = "day") -> list:
-    """Get daily message counts from chat dataframe, matching plot_number_of_messages logic.
-
-    :param df: pandas DataFrame with 'date' column
-    :param interval: time interval for grouping messages ("day", "week", "month", "year")
-    :return: list of tuples (day, count) sorted by date
-    """
-    if df.empty:
-        return []
-
-    # Match the exact logic from plot_number_of_messages
-    x_dict = {
-        "day": pd.date_range(df.date.iloc[0], date.today(), freq="D"),
-        "week": pd.date_range(
-            df.date.iloc[0] - pd.tseries.offsets.Week(1), date.today(), freq="W-MON"
-        ),
-        "month": pd.date_range(
-            df.date.iloc[0] - pd.tseries.offsets.MonthBegin(1), date.today(), freq="MS"
-        ),
-        "year": pd.date_range(
-            df.date.iloc[0] - pd.tseries.offsets.YearBegin(1), date.today(), freq="YS"
-        ),
-    }
-
-    if interval not in x_dict:
-        return []
-
-    x_pos = x_dict[interval]
-    daily_counts = []
-
-    for i in x_pos:
-        if interval == "day":
-            point = len(df[df.date == i])
-        elif interval == "week":
-            point = len(df[df.date - df.date.dt.weekday * timedelta(days=1) == i])
-        elif interval == "month":
-            point = len(df[df.date.dt.to_period("M").dt.to_timestamp() == i])
-        elif interval == "year":
-            point = len(df[df.date.dt.to_period("Y").dt.to_timestamp() == i])
-        daily_counts.append((str(i), point))
-
-    return daily_counts
-
-
 def get_most_used_words(df: pd.DataFrame, max_words: int = 100, who: str = "") -> list:
     """Get most used words from chat messages, matching plot_most_used_words logic.
 
@@ -285,38 +150,12 @@ def get_most_used_words(df: pd.DataFrame, max_words: int = 100, who: str = "") -
     if df.empty:
         return []
 
-    # Filter messages by user if specified (matching plot_emojis logic)
-    messages = (
-        df.message
-        if who == "" or who not in df.who.unique()
-        else df[df.who == who].message
-    )
-
-    # Use the exact same logic as plot_most_used_words
-    try:
-        nltk.data.find("corpora/stopwords")
-    except LookupError:
-        nltk.download("stopwords")
-
-    # Create a set of stopwords from both languages and custom blacklist
-    stop_words = set()
-    stop_words.update(stopwords.words("english"))
-    stop_words.update(stopwords.words("italian"))
-    stop_words.update(
-        i.strip()
-        for i in open(get_data_file_path("lists/blacklist.txt"), "r").readlines()
-    )
-
-    most_used_words = get_message_freq_dict(messages, blacklist=list(stop_words))
-
-    # Convert to list of tuples and limit to max_words
-    word_list = [(word, count) for word, count in most_used_words.items()]
-    word_list.sort(key=lambda x: x[1], reverse=True)
-    return word_list[:max_words]
+    who = who if who != "" and who in df.who.unique() else None
+    return Corpus(df).most_used(max_words, who)
 
 
 def get_most_used_emojis(df: pd.DataFrame, max_emojis: int = 15, who: str = "") -> list:
-    """Get most used emojis from chat messages, matching plot_emojis logic exactly.
+    """Get most used emojis from chat messages, ZWJ sequences and flags as one emoji.
 
     :param df: pandas DataFrame with 'message' column
     :param max_emojis: maximum number of emojis to return
@@ -326,30 +165,8 @@ def get_most_used_emojis(df: pd.DataFrame, max_emojis: int = 15, who: str = "")
     if df.empty:
         return []
 
-    # Filter messages by user if specified (matching plot_emojis logic)
-    messages = (
-        df.message
-        if who == "" or who not in df.who.unique()
-        else df[df.who == who].message
-    )
-
-    # Use the exact same logic as plot_emojis
-    emojis = {}
-    for message in messages:
-        for char in message:
-            if char in EMOJI_DATA:
-                if char not in emojis:
-                    emojis[char] = 0
-                emojis[char] += 1
-
-    for skin in ["🏻", "🏼"]:
-        if skin in emojis:
-            emojis.pop(skin)
-
-    # Sort and limit to max_emojis
-    emoji_list = [(emoji, count) for emoji, count in emojis.items()]
-    emoji_list.sort(key=lambda x: x[1], reverse=True)
-    return emoji_list[:max_emojis]
+    who = who if who != "" and who in df.who.unique() else None
+    return EmojiCounts(df).most_used(max_emojis, who)
 
 
 def spider_plot(categories: list, values: list) -> None:
@@ -0,0 +1,26 @@
+"""
+Shared setup of the backend tests, run with python -m pytest from backend/.
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Example chat of the repository, the reference the statistics are checked against
+EXAMPLE_CHAT = os.path.join(
+    os.path.dirname(BACKEND_DIR), "text_files", "Chat WhatsApp con ESEMPIO.txt"
+)
+
+# Tests import the app modules the way the app does, from src
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope="session")
+def example_df():
+    """Compact DataFrame of the example chat."""
+    from src.parser.columnar import to_frame, to_typed
+    from src.parser.engine import read_columns
+
+    return to_frame(to_typed(read_columns(EXAMPLE_CHAT)))
@@ -0,0 +1,107 @@
+"""
+Uploads posted to the API are decompressed, hashed and parsed without temporary copies.
+"""
+
+import gzip
+import io
+import time
+import zipfile
+
+import pytest
+
+from conftest import EXAMPLE_CHAT
+from src.cache import prefix_meta
+from src.parser.engine import read_stream
+
+with open(EXAMPLE_CHAT, "rb") as fp:
+    CHAT = fp.read()
+
+
+class Parsed(Exception):
+    """Raised by the stubbed PDF constructor, ending the job once the chat is parsed."""
+
+
+@pytest.fixture
+def application(tmp_path, monkeypatch):
+    from src import db
+
+    # Importing the app creates its tables, keep them out of the tracked database
+    monkeypatch.setattr(db, "SQLITE_PATH", str(tmp_path / "analytics.db"))
+    from api import application
+
+    application.init_db()  # Only run on the first import
+    def parsed(file_path, lang, df, media_count):
+        raise Parsed(f"{len(df)} messages")
+
+    monkeypatch.setattr(application, "PDF_Constructor", parsed)
+    monkeypatch.setattr(application.chat_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(application, "TEMP_DIR", str(tmp_path / "temp"))
+    (tmp_path / "temp").mkdir()
+    return application
+
+
+@pytest.fixture
+def temp_files(application, monkeypatch):
+    """Directories of the temporary files the app creates."""
+    created = []
+    temporary_file = application.tempfile.TemporaryFile
+
+    def record(*args, **kwargs):
+        created.append(kwargs.get("dir"))
+        return temporary_file(*args, **kwargs)
+
+    monkeypatch.setattr(application.tempfile, "TemporaryFile", record)
+    return created
+
+
+def post(application, filename: str, data: bytes) -> dict:
+    """Upload a chat and return the progress of its job once it has ended."""
+    client = application.app.test_client()
+    response = client.post(
+        "/generate",
+        data={"chat": (io.BytesIO(data), filename), "lang": "en"},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    request_id = response.get_json()["request_id"]
+    for _ in range(100):
+        progress = client.get(f"/progress/{request_id}").get_json()
+        if progress["status"] in ("completed", "error"):
+            return progress
+        time.sleep(0.05)
+    raise TimeoutError(request_id)
+
+
+def zipped(data: bytes) -> bytes:
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("Chat WhatsApp con ESEMPIO.txt", data)
+        zf.writestr("IMG-1.jpg", b"jpg")
+    return stream.getvalue()
+
+
+@pytest.mark.parametrize(
+    "filename, data",
+    [
+        ("Chat WhatsApp con ESEMPIO.txt.gz", gzip.compress(CHAT)),
+        ("WhatsApp Chat.zip", zipped(CHAT)),
+    ],
+)
+def test_upload_is_parsed_without_temporary_file(
+    application, temp_files, filename, data
+):
+    progress = post(application, filename, data)
+    assert progress["error"] == "381 messages"
+    assert application.TEMP_DIR not in temp_files
+
+
+def test_upload_of_cached_chat_is_spooled(application, temp_files):
+    cache = application.chat_cache
+    df = application.to_frame(application.to_typed(read_stream(io.BytesIO(CHAT))))
+    meta = {**prefix_meta(io.BytesIO(CHAT)), "media_count": None}
+    cache.put(cache.content_hash(io.BytesIO(CHAT)), df, meta)
+    hits = cache.stats()["hits"]
+    progress = post(application, "chat.txt.gz", gzip.compress(CHAT))
+    assert progress["error"] == "381 messages"
+    assert temp_files == [application.TEMP_DIR]  # The cache has to seek through it
+    assert cache.stats()["hits"] == hits + 1
@@ -0,0 +1,67 @@
+"""
+Chat member lookup and streaming of zipped exports.
+"""
+
+import io
+import zipfile
+
+import pytest
+
+from src.parser.archive import ZIP_ERRORS, check_zip, is_zip, open_zip
+
+CHAT = b"[01/02/23, 09:15:00] Anna: Ciao\n"
+
+
+def archive(members: dict) -> io.BytesIO:
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    stream.seek(0)
+    return stream
+
+
+@pytest.mark.parametrize(
+    "members, name",
+    [
+        ({"_chat.txt": CHAT, "notes.txt": b"x" * 99, "IMG.jpg": b""}, "_chat.txt"),
+        ({"WhatsApp Chat A.txt": CHAT, "doc.txt": b"x" * 99}, "WhatsApp Chat A.txt"),
+        ({"export.txt": CHAT, "IMG.jpg": b"", "VID.mp4": b""}, "export.txt"),
+    ],
+)
+def test_open_chat_member(members, name):
+    stream = archive(members)
+    assert is_zip(stream) and stream.tell() == 0
+    check_zip(stream)
+    assert stream.tell() == 0
+    raw, member, media_count = open_zip(stream)
+    assert (member, media_count) == (name, len(members) - 1)
+    with raw:
+        assert raw.read() == CHAT
+
+
+def test_archive_without_chat():
+    stream = archive({"IMG-1.jpg": b"jpg"})
+    with pytest.raises(ValueError, match="No chat file"):
+        check_zip(stream)
+    with pytest.raises(ValueError, match="No chat file"):
+        open_zip(stream)
+
+
+def test_corrupt_archive():
+    data = archive({"_chat.txt": CHAT * 100}).getvalue()
+    truncated = io.BytesIO(data[: len(data) // 2])
+    assert is_zip(truncated)
+    with pytest.raises(ValueError, match="Couldn't read the archive"):
+        check_zip(truncated)
+    with pytest.raises(ValueError, match="Couldn't read the archive"):
+        open_zip(truncated)
+    assert not is_zip(io.BytesIO(CHAT))
+
+
+def test_corrupt_chat_member():
+    data = bytearray(archive({"_chat.txt": CHAT * 100}).getvalue())
+    data[40:60] = bytes(20)  # Inside the deflated chat, the directory is intact
+    raw, _, _ = open_zip(io.BytesIO(bytes(data)))
+    with pytest.raises(ZIP_ERRORS):
+        raw.read()
@@ -0,0 +1,97 @@
+"""
+Cache lookups and the extension of a cached chat by a later export of it.
+"""
+
+import io
+
+import pandas as pd
+import pytest
+
+from src import cache
+from src.parser.columnar import to_frame, to_typed
+from src.parser.engine import read_stream
+
+
+def chat(days: range) -> bytes:
+    lines = (
+        f"[{day:02d}/01/23, 10:{minute:02d}:00] {who}: message {day} {minute}\n"
+        for day in days
+        for minute in range(30)
+        for who in ("Anna", "Luca")
+    )
+    return "".join(lines).encode("utf8")
+
+
+def parse(data: bytes) -> pd.DataFrame:
+    return to_frame(to_typed(read_stream(io.BytesIO(data))))
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path))
+
+
+def store(data: bytes) -> str:
+    key = cache.content_hash(io.BytesIO(data))
+    cache.put(key, parse(data), cache.prefix_meta(io.BytesIO(data)))
+    return key
+
+
+def test_get():
+    old = chat(range(1, 11))
+    assert cache.get(cache.content_hash(io.BytesIO(old))) is None
+    key = store(old)
+    df, meta = cache.get(key)
+    pd.testing.assert_frame_equal(df, parse(old))
+    assert meta["size"] == len(old) and meta["format"] == "IOS"
+
+
+def test_prefix_meta_needs_a_complete_head():
+    assert cache.prefix_meta(io.BytesIO(b"")) == {}
+    assert cache.prefix_meta(io.BytesIO(chat(range(1, 2))[:100])) == {}
+    data = chat(range(1, 11))
+    assert "format" not in cache.prefix_meta(io.BytesIO(data[:-1]))  # Can't be extended
+    stream = io.BytesIO(b"skipped" + data)
+    stream.seek(7)
+    meta = cache.prefix_meta(stream)
+    assert meta["size"] == len(data)
+    assert stream.tell() == 7
+
+
+def test_hashing_reader_matches_seekable_hash():
+    data = chat(range(1, 11))
+    raw = io.BytesIO(data)
+    head = cache.read_head(raw)
+    reader = cache.HashingReader(raw, head)
+    assert io.BufferedReader(reader).read() == data
+    assert reader.content_hash() == cache.content_hash(io.BytesIO(data))
+    assert reader.prefix_meta("IOS") == cache.prefix_meta(io.BytesIO(data))
+
+
+def test_has_head():
+    data = chat(range(1, 11))
+    head = cache.read_head(io.BytesIO(chat(range(1, 21))))
+    assert not cache.has_head(head)
+    store(data)
+    assert cache.has_head(head)
+    assert not cache.has_head(head[:100])
+
+
+def test_extend_previous_export():
+    old, new = chat(range(1, 11)), chat(range(1, 21))
+    store(chat(range(1, 6)))
+    store(old)
+    stream = io.BytesIO(new)
+    df = cache.get_extended(stream, cache.prefix_meta(stream))
+    assert stream.tell() == 0
+    pd.testing.assert_frame_equal(df, parse(new))
+
+
+def test_edited_prefix_is_not_extended():
+    old = chat(range(1, 11))
+    store(old)
+    new = bytearray(chat(range(1, 21)))
+    new[len(old) - 10] ^= 1  # Same head, different prefix
+    stream = io.BytesIO(bytes(new))
+    assert cache.get_extended(stream, cache.prefix_meta(stream)) is None
+    assert cache.get_extended(stream, {}) is None
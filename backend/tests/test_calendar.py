@@ -0,0 +1,72 @@
+"""
+Active and inactive streaks of the array calendar.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.stats.calendar import Calendar, to_timestamp
+
+
+def day(txt: str) -> int:
+    return int(np.datetime64(txt, "D").astype(np.int64))
+
+
+def streak(first: str, last: str, days: int) -> tuple:
+    return pd.Timestamp(first), pd.Timestamp(last), days
+
+
+# Active: 29-31/12/21 and 01-02/01/22 (one streak across new year),
+# 05/01/22, 10-12/01/22; repeated and unsorted days are ignored
+DAYS = [
+    "2022-01-11", "2021-12-29", "2021-12-30", "2021-12-31", "2022-01-01",
+    "2022-01-02", "2022-01-05", "2022-01-10", "2022-01-12", "2022-01-11",
+]  # fmt: skip
+CALENDAR = Calendar(np.array([day(txt) for txt in DAYS]))
+
+
+def test_streaks_and_gaps():
+    assert len(CALENDAR) == 9
+    assert CALENDAR.streaks().days.tolist() == [5, 1, 3]
+    assert CALENDAR.gaps().days.tolist() == [2, 4]
+    assert to_timestamp(CALENDAR.gaps().start.iloc[0]) == pd.Timestamp("2022-01-03")
+
+
+def test_top_streaks_and_gaps():
+    assert CALENDAR.top_streaks(2) == [
+        streak("2021-12-29", "2022-01-02", 5),
+        streak("2022-01-10", "2022-01-12", 3),
+    ]
+    assert CALENDAR.top_gaps(5) == [
+        streak("2022-01-06", "2022-01-09", 4),
+        streak("2022-01-03", "2022-01-04", 2),
+    ]
+    assert CALENDAR.longest_streak() == streak("2021-12-29", "2022-01-02", 5)
+    assert CALENDAR.longest_gap() == streak("2022-01-06", "2022-01-09", 4)
+
+
+def test_ties_keep_the_earliest():
+    calendar = Calendar(np.array([day("2022-03-01"), day("2022-03-03")]))
+    assert calendar.top_streaks(1) == [streak("2022-03-01", "2022-03-01", 1)]
+
+
+def test_streaks_per_year_split_at_new_year():
+    assert CALENDAR.streaks_per_year().to_dict() == {2021: 3, 2022: 3}
+
+
+def test_empty_and_gapless_calendars():
+    empty = Calendar(np.array([], dtype=np.int64))
+    assert empty.longest_streak() is None and empty.longest_gap() is None
+    assert empty.top_streaks(3) == [] and empty.streaks_per_year().empty
+    gapless = Calendar(np.arange(day("2022-01-01"), day("2022-01-04")))
+    assert gapless.longest_gap() is None
+    assert gapless.longest_streak() == streak("2022-01-01", "2022-01-03", 3)
+
+
+def test_example_chat(example_df):
+    calendar = Calendar(example_df.day.to_numpy())
+    assert len(calendar) == 127
+    # The old loops reported the same dates, counting day differences (10 and 17)
+    assert calendar.longest_streak() == streak("2021-10-17", "2021-10-27", 11)
+    assert calendar.longest_gap() == streak("2022-06-12", "2022-06-27", 16)
+    assert calendar.streaks_per_year().to_dict() == {2021: 11, 2022: 5}
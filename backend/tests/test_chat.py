@@ -0,0 +1,97 @@
+"""
+Chat statistics of the example chat, checked against the results of the original code.
+"""
+
+import io
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from conftest import BACKEND_DIR, EXAMPLE_CHAT
+from src.parser.archive import open_zip
+from src.parser.columnar import to_frame, to_typed
+from src.parser.engine import read_text
+from src.pdf.constructor import PDF_Constructor
+from src.stats.chat import ChatStats
+
+EXAMPLE_FILES = 73  # "<Media omessi>" placeholders of the example chat
+EXAMPLE_PARTICIPANTS = 12
+# The PDF font isn't in the repository, get_analytics needs a PDF_Constructor
+HAS_PDF_FONT = os.path.exists(os.path.join(BACKEND_DIR, "my_fonts", "seguiemj.ttf"))
+
+
+def open_archive_without_media() -> tuple:
+    """Return the example chat parsed from an archive without media, and its count."""
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.write(EXAMPLE_CHAT, "Chat WhatsApp con ESEMPIO.txt")
+    stream.seek(0)
+    raw, _, media_count = open_zip(stream)
+    with io.TextIOWrapper(raw, encoding="utf8") as fp:
+        return to_frame(to_typed(read_text(fp))), media_count
+
+
+def test_archive_without_media_counts_placeholders():
+    df, media_count = open_archive_without_media()
+    assert media_count == 0
+    assert ChatStats(df, media_count).files_sent == EXAMPLE_FILES
+
+
+@pytest.mark.skipif(not HAS_PDF_FONT, reason="seguiemj.ttf isn't installed")
+def test_analytics_of_archive_without_media():
+    df, media_count = open_archive_without_media()
+    pdf = PDF_Constructor(EXAMPLE_CHAT, df=df, media_count=media_count)
+    analytics = pdf.get_analytics()
+    assert analytics["files_shared_count"] == EXAMPLE_FILES
+    assert analytics["participants_count"] == EXAMPLE_PARTICIPANTS
+    assert "participants" not in pdf.stats.timings  # Counted from sender_counts
+
+
+def test_archive_media_count(example_df):
+    assert ChatStats(example_df, 5).files_sent == 5
+    assert ChatStats(example_df).files_sent == EXAMPLE_FILES
+
+
+def test_participants(example_df):
+    stats = ChatStats(example_df)
+    assert len(stats.sender_counts) == EXAMPLE_PARTICIPANTS
+    assert "participants" not in stats.timings
+    table = stats.participants
+    assert table.index.tolist() == stats.sender_counts.index.tolist()
+    assert table.messages.tolist() == stats.sender_counts.tolist()
+    assert table.media.sum() == EXAMPLE_FILES
+
+
+def test_example_chat(example_df):
+    stats = ChatStats(example_df)
+    assert stats.total == 381
+    assert stats.active_days == 127
+    assert stats.first_day == pd.Timestamp("2021-09-13")
+    assert stats.day_counts.index[-1] == pd.Timestamp("2022-06-28")
+    assert stats.most_active_day() == (pd.Timestamp("2021-09-21"), 15)
+    assert stats.most_active_year() == (2021, 262)
+    assert stats.most_active_month() == (pd.Period("2021-09", "M"), 103)
+    assert stats.most_active_weekday() == (1, 86)
+    assert stats.most_active_person() == ("Lennon Holder", 38)
+    assert stats.avg_words_per_message() == 3.11
+    assert stats.files_sent == EXAMPLE_FILES
+    assert stats.message_counts("day", until_last_message=True)[:4] == [
+        ("2021-09-13 00:00:00", 1),
+        ("2021-09-14 00:00:00", 13),
+        ("2021-09-15 00:00:00", 13),
+        ("2021-09-16 00:00:00", 6),
+    ]
+    assert stats.top_words(3) == [("grazie", 15), ("fatto", 8), ("così", 7)]
+    assert stats.top_emojis(2) == [("😂", 14), ("👊", 3)]
+
+
+def test_metrics_share_their_nodes(example_df):
+    stats = ChatStats(example_df)
+    assert stats.timings == {}
+    stats.most_active_weekday()
+    assert list(stats.timings) == ["cube", "weekday_counts"]
+    stats.most_active_person()
+    assert list(stats.timings) == ["cube", "weekday_counts", "sender_counts"]
+    assert stats.top_words(3) is stats.top_words(3)
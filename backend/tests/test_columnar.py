@@ -0,0 +1,81 @@
+"""
+Conversion of the parsed string columns to the compact chat DataFrame.
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.parser.columnar import (
+    append_tail,
+    compact_frame,
+    concat_frames,
+    day_seconds,
+    epoch_day,
+    to_frame,
+    to_typed,
+)
+from src.parser.formats import get_format
+
+COLUMNS = {
+    "date": ["01/02/23", "01/02/23", "02/02/23"],
+    "time": ["09:15:00", "09:16:30", "21:00:05"],
+    "who": ["Anna", "Luca", "Anna"],
+    "message": ["Ciao!", "Buongiorno", "Bene"],
+}
+
+
+@pytest.mark.parametrize(
+    "txt, day",
+    [
+        ("01/01/70", 36525),  # Two digit years are of this century
+        ("01/01/1970", 0),
+        ("01/02/23", 19389),
+        ("01/02/2023", 19389),
+        ("29/02/24", 19782),
+        ("12/31/23", 19722),  # Month first, swapped back
+    ],
+)
+def test_epoch_day(txt, day):
+    assert epoch_day(txt) == day
+
+
+def test_day_seconds():
+    assert day_seconds("00:00:00") == 0
+    assert day_seconds("09:16:30") == 9 * 3600 + 16 * 60 + 30
+    assert day_seconds("23:59:59") == 24 * 3600 - 1
+
+
+def test_to_frame():
+    df = to_frame(to_typed(COLUMNS))
+    assert list(df.columns) == ["day", "seconds", "who", "message"]
+    assert df.day.dtype == np.int32 and df.seconds.dtype == np.int32
+    assert isinstance(df.who.dtype, pd.CategoricalDtype)
+    assert df.day.tolist() == [19389, 19389, 19390]
+    assert df.seconds.tolist() == [33300, 33390, 75605]
+    assert df.who.tolist() == COLUMNS["who"]
+    assert df.message.tolist() == COLUMNS["message"]
+    # A cached frame read back with plain dtypes is made compact again
+    plain = df.astype({"day": "int64", "who": object, "message": object})
+    pd.testing.assert_frame_equal(compact_frame(plain), df)
+
+
+def test_concat_frames_keeps_senders_categorical():
+    first = to_frame(to_typed(COLUMNS))
+    second = to_frame(to_typed({**COLUMNS, "who": ["Luca", "Marta", "Luca"]}))
+    df = concat_frames([first, second])
+    assert list(df.columns) == list(first.columns)
+    assert isinstance(df.who.dtype, pd.CategoricalDtype)
+    assert df.who.tolist() == COLUMNS["who"] + ["Luca", "Marta", "Luca"]
+
+
+def test_append_tail():
+    df = to_frame(to_typed(COLUMNS))
+    tail = io.StringIO("come va?\n[03/02/23, 08:00:00] Luca: Tutto bene\n")
+    extended = append_tail(df, tail, get_format("IOS"))
+    assert extended.message.tolist()[2:] == ["Bene\ncome va?\n", "Tutto bene"]
+    assert extended.day.tolist() == [19389, 19389, 19390, 19391]
+    older = io.StringIO("[01/01/23, 08:00:00] Luca: Vecchio\n")
+    assert append_tail(df, older, get_format("IOS")) is None
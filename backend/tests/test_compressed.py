@@ -0,0 +1,37 @@
+"""
+Detection and streaming decompression of compressed exports.
+"""
+
+import gzip
+import io
+
+import pytest
+
+from src.parser.compressed import DECOMPRESS_ERRORS, compression, decompressing_reader
+
+CHAT = b"[01/02/23, 09:15:00] Anna: Ciao\n" * 1000
+
+
+def test_gzip():
+    stream = io.BytesIO(gzip.compress(CHAT))
+    assert compression(stream) == "gzip" and stream.tell() == 0
+    with decompressing_reader(stream, "gzip") as reader:
+        assert reader.read() == CHAT
+    assert not stream.closed
+
+
+def test_plain_text():
+    assert compression(io.BytesIO(CHAT)) is None
+    assert compression(io.BytesIO(b"")) is None
+
+
+def test_corrupt_gzip():
+    data = gzip.compress(CHAT)
+    reader = decompressing_reader(io.BytesIO(data[: len(data) // 2]), "gzip")
+    with pytest.raises(DECOMPRESS_ERRORS):
+        reader.read()
+
+
+def test_unsupported_encoding():
+    with pytest.raises(ValueError, match="Unsupported compression"):
+        decompressing_reader(io.BytesIO(CHAT), "br")
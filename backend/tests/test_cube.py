@@ -0,0 +1,74 @@
+"""
+Message counts of the count cube against counts over the whole chat.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.stats.cube import SLOT_SECONDS, SLOTS, CountCube
+
+
+def frame(rows: list) -> pd.DataFrame:
+    """Build a compact chat frame from (date, seconds, who) rows."""
+    return pd.DataFrame(
+        {
+            "day": [np.datetime64(txt, "D").astype(np.int64) for txt, _, _ in rows],
+            "seconds": [seconds for _, seconds, _ in rows],
+            "who": pd.Categorical([who for _, _, who in rows]),
+            "message": ["..."] * len(rows),
+        }
+    )
+
+
+# 2023-01-02 was a Monday
+CUBE = CountCube(
+    frame(
+        [
+            ("2023-01-02", 0, "Anna"),
+            ("2023-01-02", 60, "Anna"),  # Same cell as the message before
+            ("2023-01-02", SLOT_SECONDS, "Luca"),
+            ("2023-01-04", 23 * 3600, "Anna"),
+            ("2023-01-08", 86399, "Luca"),
+        ]
+    )
+)
+
+
+def test_cells():
+    assert len(CUBE) == 4
+    assert CUBE.count.sum() == 5
+
+
+def test_by_sender():
+    assert CUBE.by_sender().to_dict() == {"Anna": 3, "Luca": 2}
+
+
+def test_by_slot():
+    slots = CUBE.by_slot()
+    assert len(slots) == SLOTS
+    assert (slots[0], slots[1], slots[46], slots[47]) == (2, 1, 1, 1)
+    assert CUBE.by_slot("Luca").sum() == 2
+    assert CUBE.by_slot("Nobody").sum() == 0
+
+
+def test_by_weekday():
+    assert CUBE.by_weekday().tolist() == [3, 0, 1, 0, 0, 0, 1]
+    assert CUBE.by_weekday("Anna").tolist() == [2, 0, 1, 0, 0, 0, 0]
+
+
+def test_by_day():
+    days = CUBE.by_day()
+    assert days.index.tolist() == list(
+        pd.to_datetime(["2023-01-02", "2023-01-04", "2023-01-08"])
+    )
+    assert days.tolist() == [3, 1, 1]
+    assert CUBE.by_day("Luca").tolist() == [1, 1]
+    assert len(CUBE.by_day("Nobody")) == 0
+
+
+def test_example_chat(example_df):
+    cube = CountCube(example_df)
+    assert cube.by_sender().sum() == len(example_df)
+    counts = example_df.groupby("day").size()
+    assert cube.by_day().tolist() == counts.tolist()
+    assert len(cube) < len(example_df)
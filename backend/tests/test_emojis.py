@@ -0,0 +1,58 @@
+"""
+Emoji sequences found in messages and counted per sender.
+"""
+
+import pandas as pd
+
+from src.stats.emojis import EmojiCounts, find_emojis, plot_label
+
+MAN_RAISING_HAND = "\U0001f64b\U0001f3fb\u200d\u2642\ufe0f"  # Skin tone and gender
+ITALY = "\U0001f1ee\U0001f1f9"
+
+
+def test_find_emojis():
+    assert find_emojis("ciao") == []
+    assert find_emojis("😂😂 ok 👍") == ["😂", "😂", "👍"]
+    # Sequences are one emoji, variants their fully qualified form
+    assert find_emojis(f"{MAN_RAISING_HAND} {ITALY}") == [MAN_RAISING_HAND, ITALY]
+    assert find_emojis("❤ ❤️") == ["❤️"] * 2
+    assert find_emojis("\U0001f3fb") == []  # A skin tone alone isn't an emoji
+
+
+def test_plot_label():
+    assert plot_label(MAN_RAISING_HAND) == "🙋"
+    assert plot_label(ITALY) == "\U0001f3f3"
+    assert plot_label("😂") == "😂"
+
+
+def test_counts():
+    df = pd.DataFrame(
+        {
+            "who": ["Anna", "Luca", "Anna", "Luca"],
+            "message": ["😂 ciao 👍", "😂😂", "no", f"🙋 {MAN_RAISING_HAND}"],
+        }
+    )
+    emojis = EmojiCounts(df)
+    assert emojis.per_message.tolist() == [2, 2, 0, 2]
+    assert emojis.counts().to_dict() == {
+        "😂": 3,
+        "👍": 1,
+        "🙋": 1,
+        MAN_RAISING_HAND: 1,
+    }
+    assert emojis.most_used(1, "Luca") == [("😂", 2)]
+    assert emojis.most_used(who="Marta") == []
+    # Labels merge the emojis drawn the same way
+    assert emojis.most_used(2, labels=True) == [("😂", 3), ("🙋", 2)]
+
+
+def test_example_chat(example_df):
+    emojis = EmojiCounts(example_df)
+    # The original code split sequences, counting the ♂ of 🙋‍♂️ on its own
+    assert emojis.most_used(4, labels=True) == [
+        ("😂", 14),
+        ("👊", 3),
+        ("🙋", 2),
+        ("😅", 2),
+    ]
+    assert emojis.per_message.sum() == emojis.counts().sum()
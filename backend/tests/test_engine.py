@@ -0,0 +1,88 @@
+"""
+Line, memory-mapped and parallel parsing of a chat give the same messages.
+"""
+
+import io
+import tempfile
+
+from src.parser import engine
+from src.parser.engine import parse_chat, read_stream, split_ranges
+from src.parser.formats import get_format
+
+CHAT = (
+    "[01/02/23, 09:15:00] Anna: Ciao!\n"
+    "[01/02/23, 09:16:30] Luca: Buongiorno\n"
+    "come stai?\n"
+    "[01/02/23, 09:17:00] Luca ha cambiato l'immagine del gruppo\n"
+    "[02/02/23, 21:00:05] Anna: Bene\n"
+    "\n"
+    "grazie\n"
+) * 50
+
+# Continuation lines keep their newline, as the original get_data did
+FIRST_ROWS = [
+    ["01/02/23", "09:15:00", "Anna", "Ciao!"],
+    ["01/02/23", "09:16:30", "Luca", "Buongiorno\ncome stai?\n"],
+    ["02/02/23", "21:00:05", "Anna", "Bene\n\n\ngrazie\n"],
+]
+
+
+def write_chat(tmp_path, txt: str = CHAT) -> str:
+    file = tmp_path / "chat.txt"
+    file.write_bytes(txt.encode("utf8"))
+    return str(file)
+
+
+def test_line_parsing(tmp_path):
+    rows = parse_chat(write_chat(tmp_path), bulk=False, workers=1)
+    assert len(rows) == 150
+    assert rows[:3] == FIRST_ROWS
+
+
+def test_every_engine_agrees(tmp_path):
+    file = write_chat(tmp_path)
+    lines = parse_chat(file, bulk=False, workers=1)
+    assert parse_chat(file, bulk=True, workers=1) == lines
+    assert parse_chat(file, workers=3) == lines
+
+
+def test_ranges_start_on_message_lines():
+    buf = CHAT.encode("utf8")
+    fmt = get_format("IOS")
+    bounds = split_ranges(buf, fmt, 4)
+    assert bounds[0] == 0 and bounds[-1] == len(buf)
+    assert bounds == sorted(bounds)
+    for pos in bounds[1:-1]:
+        assert fmt.byte_pattern.match(buf, pos)
+    assert split_ranges(b"junk\n" + buf, fmt, 4, 5)[:2] == [5, bounds[1] + 5]
+
+
+def test_read_stream_from_position():
+    stream = io.BytesIO(b"junk\n" + CHAT.encode("utf8"))
+    stream.seek(5)
+    for bulk in (False, True):
+        stream.seek(5)
+        columns = read_stream(stream, bulk=bulk)
+        assert columns["who"][:3] == ["Anna", "Luca", "Anna"]
+        assert len(columns["message"]) == 150
+    assert not stream.closed
+
+
+def test_read_stream_in_parallel(tmp_path, monkeypatch):
+    data = b"junk\n" + CHAT.encode("utf8")
+    expected = read_stream(io.BytesIO(CHAT.encode("utf8")))
+    files = []
+    parse_parallel = engine.parse_parallel
+    monkeypatch.setattr(
+        engine,
+        "parse_parallel",
+        lambda file, *args: files.append(file) or parse_parallel(file, *args),
+    )
+    file = tmp_path / "chat.txt"
+    file.write_bytes(data)
+    with open(file, "rb") as named, tempfile.TemporaryFile() as anonymous:
+        anonymous.write(data)
+        for stream in (named, anonymous):
+            stream.seek(5)
+            assert read_stream(stream, workers=3) == expected
+    assert files[0] == str(file) and len(files) == 2  # Anonymous file from /proc
@@ -0,0 +1,80 @@
+"""
+Sniffing and normalization of the registered chat formats.
+"""
+
+import pytest
+
+from src.parser.formats import ChatFormat, get_format, register, sniff, sniff_buffer
+
+
+def first_message(lines: list) -> tuple:
+    fmt = sniff(lines)
+    date, time, who, message = fmt.pattern.search(lines[0]).groups()
+    return fmt.name, fmt.normalize_date(date), fmt.normalize_time(time), who, message
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        (
+            "[01/02/23, 09:15:00] Anna: Ciao",
+            ("IOS", "01/02/23", "09:15:00", "Anna", "Ciao"),
+        ),
+        (
+            "01/02/23, 09:15 - Anna: Ciao",
+            ("Android", "01/02/23", "09:15:00", "Anna", "Ciao"),
+        ),
+        (
+            "[01.10.2021, 21:01:00] Anna: hallo",
+            ("IOS d.m.y", "01/10/21", "21:01:00", "Anna", "hallo"),
+        ),
+        (
+            "2021-10-01, 21:01 - Anna: hi",
+            ("Android y-m-d", "01/10/21", "21:01:00", "Anna", "hi"),
+        ),
+        (
+            "9/1/21, 12:05 AM - Bob Smith: hi",
+            ("Android m/d/y 12h", "01/09/21", "00:05:00", "Bob Smith", "hi"),
+        ),
+        (
+            "[1/9/21, 3:05:00 p.m.] Bob: hi",
+            ("IOS m/d/y 12h", "09/01/21", "15:05:00", "Bob", "hi"),
+        ),
+    ],
+)
+def test_sniff_and_normalize(line, expected):
+    assert first_message([line + "\n"]) == expected
+
+
+def test_day_above_twelve_picks_day_first():
+    lines = ["9/1/21, 3:05 PM - Bob: hi\n", "13/1/21, 3:06 PM - Bob: hi\n"]
+    assert sniff(lines).name == "Android d/m/y 12h"
+
+
+def test_most_matching_lines_win():
+    lines = [
+        "[01/02/23, 09:15:00] Anna: Ciao\n",
+        "continued\n",
+        "[01/02/23, 09:16:00] Luca: Ciao\n",
+    ]
+    assert sniff(lines).name == "IOS"
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError, match="Couldn't detect the chat format"):
+        sniff(["hello there\n"])
+    with pytest.raises(ValueError):
+        sniff([])
+
+
+def test_sniff_buffer_from_position():
+    buf = b"garbage\n[01.10.2021, 21:01:00] Anna: hallo\n"
+    assert sniff_buffer(buf, 8).name == "IOS d.m.y"
+
+
+def test_registry():
+    assert get_format("IOS").clock == 24
+    with pytest.raises(KeyError):
+        get_format("Nokia")
+    with pytest.raises(ValueError):
+        register(ChatFormat("IOS", r"(\d+) (\d+) "))
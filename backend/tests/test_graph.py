@@ -0,0 +1,51 @@
+"""
+Lazy metric nodes computed once, after the nodes they depend on.
+"""
+
+from src.stats.chat import ChatStats
+from src.stats.graph import MetricGraph, metric
+
+
+class Graph(MetricGraph):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    @metric()
+    def base(self) -> int:
+        """Base value."""
+        self.calls.append("base")
+        return 2
+
+    @metric("base")
+    def square(self) -> int:
+        self.calls.append("square")
+        return self.base**2
+
+    def power(self, n: int) -> int:
+        return self.compute(f"power[{n}]", lambda: self.base**n, ("base",))
+
+
+def test_nodes_are_computed_once_after_their_dependencies():
+    graph = Graph()
+    assert graph.calls == [] and graph.timings == {}
+    assert graph.square == 4 and graph.square == 4
+    assert graph.calls == ["base", "square"]
+    assert list(graph.timings) == ["base", "square"]
+
+
+def test_parametric_nodes():
+    graph = Graph()
+    assert graph.power(3) == 8 and graph.power(3) == 8
+    assert graph.power(4) == 16
+    assert list(graph.timings) == ["base", "power[3]", "power[4]"]
+    assert graph.timing_report().count("s, ") == 2
+
+
+def test_dependencies():
+    assert Graph.dependencies() == {"base": (), "square": ("base",)}
+    assert Graph.base.__doc__ == "Base value."
+    # Every declared dependency of the chat statistics is a metric too
+    dependencies = ChatStats.dependencies()
+    for depends in dependencies.values():
+        assert set(depends) <= set(dependencies)
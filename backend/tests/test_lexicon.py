@@ -0,0 +1,23 @@
+"""
+The committed lexicon matches the word lists it is compiled from.
+"""
+
+import pytest
+
+from src import lexicon
+
+
+def test_committed_lexicon_is_up_to_date():
+    compiled = lexicon.load()
+    assert compiled["phrases"] == lexicon.read_phrases()
+    assert compiled["blacklist"] == sorted(set(lexicon.read_list("blacklist.txt")))
+    assert set(compiled["stopwords"]) == set(lexicon.STOPWORD_LANGUAGES)
+
+
+def test_missing_lexicon_is_an_error(tmp_path):
+    with pytest.raises(RuntimeError, match="run python -m src.lexicon"):
+        lexicon.load(str(tmp_path / "lexicon.json"))
+    outdated = tmp_path / "outdated.json"
+    outdated.write_text('{"version": 1}')
+    with pytest.raises(RuntimeError, match="outdated"):
+        lexicon.load(str(outdated))
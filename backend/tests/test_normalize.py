@@ -0,0 +1,37 @@
+"""
+Normalization of senders and messages and the layout of message bubbles.
+"""
+
+from src.parser.normalize import (
+    LEFT_TO_RIGHT_MARK,
+    bubble_lines,
+    bubble_size,
+    normalize_columns,
+    normalize_sender,
+)
+
+
+def test_normalize_sender():
+    assert normalize_sender("Anna ❤️") == "Anna ❤"
+    assert normalize_sender("Luca \U0001f44d\U0001f3fd") == "Luca \U0001f44d"
+    assert normalize_sender("Marta") == "Marta"
+
+
+def test_normalize_columns():
+    columns = {"message": [f"{LEFT_TO_RIGHT_MARK}<allegato: foto.jpg>", "ciao"]}
+    assert normalize_columns(columns) is columns
+    assert columns["message"] == ["<allegato: foto.jpg>", "ciao"]
+
+
+def test_bubble_lines():
+    assert bubble_lines("ciao") == ["ciao"]
+    assert bubble_lines("a\nb") == ["a", "b"]
+    assert bubble_lines("x" * 120, 50) == ["x" * 50, "x" * 51, "x" * 19]
+    assert len(bubble_lines("a\nb\nc\nd")) == 3
+
+
+def test_bubble_size():
+    assert bubble_size("ciao") == 1
+    assert bubble_size("x" * 50) == 2
+    assert bubble_size("a\nb") == 2
+    assert bubble_size("a\nb\nc\nd") == 3
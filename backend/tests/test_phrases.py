@@ -0,0 +1,60 @@
+"""
+Aho-Corasick phrase matcher and per-sender phrase counts.
+"""
+
+import pandas as pd
+
+from src.stats.phrases import PhraseCounts, PhraseMatcher
+
+LEXICONS = {
+    "greetings": ["ciao", "ciao a tutti", "buongiorno"],
+    "laughs": ["ahah*", "lol"],
+    "swears": ["culo"],
+}
+
+
+def matches(txt: str) -> list:
+    matcher = PhraseMatcher(LEXICONS)
+    return [
+        (txt[start:end], matcher.categories[category])
+        for start, end, category in matcher.find(txt)
+    ]
+
+
+def test_longest_match_at_same_start():
+    assert matches("ciao a tutti!") == [("ciao a tutti", "greetings")]
+    assert matches("ciao a te") == [("ciao", "greetings")]
+
+
+def test_whole_words_only():
+    assert matches("vaffanculo") == []
+    assert matches("ciaone lol") == [("lol", "laughs")]
+    assert matches("culo, lol") == [("culo", "swears"), ("lol", "laughs")]
+
+
+def test_open_ended_phrases():
+    assert matches("ahahahah ok") == [("ahahahah", "laughs")]
+    assert matches("ahaha") == [("ahaha", "laughs")]
+    assert matches("ah ah") == []
+
+
+def test_categories_overlap_independently():
+    matcher = PhraseMatcher({"a": ["ciao a tutti"], "b": ["tutti"]})
+    found = [(start, end) for start, end, _ in matcher.find("ciao a tutti")]
+    assert found == [(0, 12), (7, 12)]
+
+
+def test_counts_per_sender():
+    df = pd.DataFrame(
+        {
+            "who": ["Anna", "Luca", "Anna", "info"],
+            "message": ["Ciao a tutti", "AHAHAH lol", "ahah ciao", "Ciao"],
+        }
+    )
+    counts = PhraseCounts(df, PhraseMatcher(LEXICONS))
+    assert counts.count("greetings") == 3
+    assert counts.count("laughs", who="Luca") == 2
+    assert counts.count("swears") == 0
+    assert counts.count("laughs", who="Nobody") == 0
+    assert counts.top_sender("greetings") == ("Anna", 2)
+    assert counts.top_sender("swears") is None
@@ -0,0 +1,85 @@
+"""
+Response times, openers and sessions from the gaps between messages.
+"""
+
+import pandas as pd
+
+from src.stats.replies import Replies
+
+
+def frame(rows: list) -> pd.DataFrame:
+    """Build a compact chat frame from (day, "HH:MM", who) rows."""
+    return pd.DataFrame(
+        {
+            "day": [day for day, _, _ in rows],
+            "seconds": [
+                int(hour) * 3600 + int(minute) * 60
+                for _, time, _ in rows
+                for hour, minute in [time.split(":")]
+            ],
+            "who": [who for _, _, who in rows],
+            "message": ["..."] * len(rows),
+        }
+    )
+
+
+REPLIES = Replies(
+    frame(
+        [
+            (0, "10:00", "Anna"),
+            (0, "10:01", "Luca"),  # Luca answers Anna in 60s
+            (0, "10:02", "Luca"),
+            (0, "10:05", "Anna"),  # Anna answers Luca in 180s
+            (0, "12:00", "Luca"),  # Two hours later: new session, 6900s
+            (1, "09:00", "Luca"),
+            (1, "09:10", "Anna"),  # 600s
+        ]
+    )
+)
+
+
+def test_response_times():
+    times = REPLIES.response_times()
+    assert times.values.tolist() == [
+        ["Anna", "Luca", 60],
+        ["Luca", "Anna", 180],
+        ["Anna", "Luca", 6900],
+        ["Luca", "Anna", 600],
+    ]
+
+
+def test_percentiles_per_pair():
+    out = REPLIES.percentiles(q=(50, 100))
+    assert out.index.names == ["prev_who", "who"]
+    assert out.loc[("Anna", "Luca")].tolist() == [3480, 6900, 2]
+    assert out.loc[("Luca", "Anna")].tolist() == [390, 600, 2]
+    per_sender = REPLIES.percentiles(q=(50,), pairs=False)
+    assert per_sender.p50.to_dict() == {"Luca": 3480, "Anna": 390}
+
+
+def test_sessions():
+    sessions = REPLIES.sessions()
+    assert sessions.values.tolist() == [
+        [0, 3, "Anna", 4],
+        [4, 4, "Luca", 1],
+        [5, 6, "Luca", 2],
+    ]
+    assert len(REPLIES.sessions(idle=10 * 60 * 60)) == 2
+    assert Replies(frame([])).sessions().empty
+
+
+def test_openers():
+    assert REPLIES.openers().tolist() == ["Anna", "Luca"]
+    assert REPLIES.opener_counts().to_dict() == {"Anna": 1, "Luca": 1}
+
+
+def test_example_chat(example_df):
+    replies = Replies(example_df)
+    # Same first texter and typical wait as the old row by row loops
+    assert replies.opener_counts().index[0] == "Gunner Ingram"
+    first, last = len(example_df) // 4, len(example_df) * 3 // 4
+    wait = replies.central_mean(first, last, len(replies))
+    assert wait.floor("s") == pd.Timedelta(hours=3, minutes=18, seconds=55)
+    percentiles = replies.percentiles()
+    assert percentiles["count"].sum() == len(replies.response_times())
+    assert (percentiles.p25 <= percentiles.p90).all()
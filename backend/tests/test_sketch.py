@@ -0,0 +1,98 @@
+"""
+Space-Saving sketch bounds and the sketch mode of word counts.
+"""
+
+import random
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+import src.stats.words as words
+from src.stats.sketch import SpaceSaving
+
+
+def skewed_stream(size: int = 20000, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [int(rng.paretovariate(1.1)) for _ in range(size)]
+
+
+def test_exact_below_capacity():
+    sketch = SpaceSaving(capacity=10)
+    sketch.update_counts(Counter("abracadabra").items())
+    assert sketch.error_bound() == 0
+    assert sketch.top(2) == [("a", 5, 0), ("b", 2, 0)]
+
+
+def test_counts_bounds_when_full():
+    stream = skewed_stream()
+    true = Counter(stream)
+    sketch = SpaceSaving(capacity=50)
+    for start in range(0, len(stream), 1000):
+        sketch.update_counts(Counter(stream[start : start + 1000]).items())
+
+    assert sketch.total == len(stream)
+    assert len(sketch) == 50
+    assert sketch.error_bound() > 0
+    for item, count, error in sketch.top():
+        assert count - error <= true[item] <= count
+        assert error <= sketch.error_bound()
+    # Anything more frequent than total / capacity is never evicted
+    frequent = [item for item, count in true.items() if count > len(stream) / 50]
+    assert frequent and all(item in sketch.counts for item in frequent)
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        SpaceSaving(capacity=0)
+
+
+def test_corpus_sketch_matches_exact_counts():
+    df = pd.DataFrame(
+        {
+            "who": ["Anna", "Luca", "Anna", "Luca"] * 5,
+            "message": [
+                "Ciao amore, come stai?",
+                "Bene bene, pizza stasera?",
+                "Pizza! Stasera pizza",
+                "Ok amore 2024",
+            ]
+            * 5,
+        }
+    )
+    exact = words.Corpus(df, mode="exact")
+    sketch = words.Corpus(df, mode="sketch")
+
+    assert sketch.most_used() == exact.most_used()
+    assert sketch.most_used(who="Luca") == exact.most_used(who="Luca")
+    assert exact.most_used(2) == [("pizza", 15), ("amore", 10)]
+    assert sketch.error_bound() == exact.error_bound() == 0
+
+
+def test_corpus_sketch_memory_is_bounded(monkeypatch):
+    capacity = 20
+    monkeypatch.setattr(words, "TOP_K_CAPACITY", capacity)
+    sizes = []
+    update = SpaceSaving.update
+
+    def tracked_update(self, item, weight=1):
+        update(self, item, weight)
+        sizes.append(len(self))
+
+    monkeypatch.setattr(SpaceSaving, "update", tracked_update)
+    stream = skewed_stream(5000)
+    messages = [
+        " ".join(f"word{item}" for item in stream[i : i + 10])
+        for i in range(0, len(stream), 10)
+    ]
+    df = pd.DataFrame({"who": "Anna", "message": messages})
+    corpus = words.Corpus(df, mode="sketch")
+    corpus.counts()
+
+    assert len(sizes) == len(corpus) == len(stream)
+    assert max(sizes) == capacity
+    true = Counter(f"word{item}" for item in stream)
+    for word, count in corpus.counts().items():
+        error = corpus.errors()[word]
+        assert count - error <= true[word] <= count
+    assert corpus.most_used(1)[0][0] == true.most_common(1)[0][0]
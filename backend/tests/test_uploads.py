@@ -0,0 +1,75 @@
+"""
+Resumable chunked uploads: resent chunks, gaps and sizes.
+"""
+
+import pytest
+
+from src import uploads
+
+CHAT = b"[01/02/23, 09:15:00] Anna: Ciao\n[01/02/23, 09:16:00] Luca: Ciao\n"
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", str(tmp_path))
+
+
+def read(upload_id: str) -> bytes:
+    with open(uploads.part_path(upload_id), "rb") as fp:
+        return fp.read()
+
+
+def test_chunks_in_order():
+    upload_id = uploads.create("chat.txt", len(CHAT))["upload_id"]
+    assert uploads.write_chunk(upload_id, 0, CHAT[:40]) == 40
+    assert uploads.write_chunk(upload_id, 40, CHAT[40:]) == len(CHAT)
+    assert uploads.status(upload_id)["offset"] == len(CHAT)
+    assert read(upload_id) == CHAT
+
+
+def test_overlapping_chunk_is_written_again():
+    upload_id = uploads.create("chat.txt")["upload_id"]
+    uploads.write_chunk(upload_id, 0, CHAT[:40])
+    # Sent again after a lost response, and going on past the received bytes
+    assert uploads.write_chunk(upload_id, 20, CHAT[20:50]) == 50
+    # Entirely inside the received bytes
+    assert uploads.write_chunk(upload_id, 10, CHAT[10:20]) == 50
+    assert read(upload_id) == CHAT[:50]
+
+
+def test_gap_and_size_are_rejected():
+    upload_id = uploads.create("chat.txt", len(CHAT))["upload_id"]
+    uploads.write_chunk(upload_id, 0, CHAT[:40])
+    with pytest.raises(ValueError, match="offset 40"):
+        uploads.write_chunk(upload_id, 41, CHAT[41:])
+    with pytest.raises(ValueError):
+        uploads.write_chunk(upload_id, -1, CHAT)
+    with pytest.raises(ValueError):
+        uploads.write_chunk(upload_id, 40, CHAT[40:] + b"more")
+    assert uploads.status(upload_id)["offset"] == 40
+
+
+def test_first_chunk_is_prescanned():
+    upload_id = uploads.create("chat.txt")["upload_id"]
+    with pytest.raises(ValueError):
+        uploads.write_chunk(upload_id, 0, b"not a chat\nat all\n")
+    assert uploads.status(upload_id)["offset"] == 0
+    uploads.prescan(b"PK\x03\x04 rest of a zip")
+    uploads.prescan(b"\x1f\x8b rest of a gzip")
+
+
+def test_size_limits():
+    with pytest.raises(ValueError):
+        uploads.create("chat.txt", 0)
+    with pytest.raises(ValueError):
+        uploads.create("chat.txt", uploads.MAX_UPLOAD_SIZE + 1)
+
+
+def test_unknown_and_removed_uploads():
+    with pytest.raises(KeyError):
+        uploads.status("not-an-id")
+    upload_id = uploads.create("../chat.txt")["upload_id"]
+    assert uploads.status(upload_id)["filename"] == "chat.txt"
+    uploads.remove(upload_id)
+    with pytest.raises(KeyError):
+        uploads.write_chunk(upload_id, 0, CHAT)
@@ -0,0 +1,40 @@
+"""
+Word counts of the vectorized corpus.
+"""
+
+import pandas as pd
+
+from src.lexicon import STOP_WORDS
+from src.stats.words import Corpus
+
+DF = pd.DataFrame(
+    {
+        "who": ["Anna", "Luca", "Anna", "Luca"],
+        "message": ["Ciao, pizza stasera?", "PIZZA! 2024 ok", "pizza e birra", ""],
+    }
+)
+
+
+def test_counts():
+    corpus = Corpus(DF, mode="exact")
+    assert corpus.most_used(2) == [("pizza", 3), ("ciao", 1)]
+    assert len(corpus) == 6
+    assert corpus.most_used(1, who="Luca") == [("pizza", 1)]
+    assert corpus.most_used(who="Nobody") == []
+    assert corpus.words_per_message.tolist() == [3, 3, 3, 0]
+    assert corpus.error_bound() == 0
+
+
+def test_example_chat(example_df):
+    corpus = Corpus(example_df, mode="exact")
+    # Same words, counts and tie order as the old get_most_used_words
+    assert corpus.most_used(6) == [
+        ("grazie", 15),
+        ("fatto", 8),
+        ("così", 7),
+        ("capito", 6),
+        ("raga", 6),
+        ("penso", 6),
+    ]
+    assert not set(corpus.counts().index) & STOP_WORDS
+    assert round(corpus.words_per_message.sum() / len(example_df), 2) == 3.11
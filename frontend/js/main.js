@@ -3,6 +3,11 @@ const API_URL = window.location.hostname === 'localhost'
   ? 'http://localhost:5000'
   : 'https://whatsapp-wrapped-wldp.onrender.com';
 
+// Uploads bigger than this are sent with the resumable chunked upload API
+const CHUNKED_UPLOAD_THRESHOLD = 16 * 1024 * 1024;
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const UPLOAD_RETRIES = 5;
+
 document.addEventListener('DOMContentLoaded', () => {
   const form = document.getElementById('chatForm');
   const submitBtn = form.querySelector('button[type="submit"]');
@@ -141,6 +146,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const statusMessages = {
       'not_started': 'Preparing to generate PDF...',
       'starting': 'Starting PDF generation...',
+      'parsing': 'Reading the chat...',
       'generating': 'Generating PDF...',
       'finalizing': 'Finalizing PDF...',
       'completed': 'PDF generation complete!',
@@ -172,6 +178,55 @@ document.addEventListener('DOMContentLoaded', () => {
     currentRequestId = null;
   }
 
+  // Big exports are sent in chunks, a failed chunk is sent again instead of the whole file
+  async function uploadInChunks(blob, name, lang) {
+    const jsonRequest = (method, body) => ({
+      method,
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(body),
+      mode: 'cors'
+    });
+    const initResponse = await fetch(`${API_URL}/upload`, jsonRequest('POST', { filename: name, size: blob.size }));
+    if (!initResponse.ok) {
+      return initResponse;
+    }
+    const { upload_id: uploadId } = await initResponse.json();
+
+    let offset = 0;
+    let failures = 0;
+    while (offset < blob.size) {
+      showStatus(`Uploading... ${Math.floor((100 * offset) / blob.size)}%`, 'info');
+      try {
+        const chunkResponse = await fetch(`${API_URL}/upload/${uploadId}?offset=${offset}`, {
+          method: 'PUT',
+          body: blob.slice(offset, offset + UPLOAD_CHUNK_SIZE),
+          mode: 'cors'
+        });
+        if (chunkResponse.status === 400 || chunkResponse.status === 404) {
+          return chunkResponse;
+        }
+        if (!chunkResponse.ok && chunkResponse.status !== 409) {
+          throw new Error(`HTTP error! status: ${chunkResponse.status}`);
+        }
+        offset = (await chunkResponse.json()).offset;
+        failures = 0;
+      } catch (error) {
+        if (++failures > UPLOAD_RETRIES) {
+          throw error;
+        }
+        // Resume from what the server actually received
+        await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+        const statusResponse = await fetch(`${API_URL}/upload/${uploadId}`, { mode: 'cors' }).catch(() => null);
+        if (statusResponse && statusResponse.ok) {
+          offset = (await statusResponse.json()).offset;
+        }
+      }
+    }
+
+    showStatus('Starting PDF generation...', 'info');
+    return fetch(`${API_URL}/upload/${uploadId}/finalize`, jsonRequest('POST', { lang }));
+  }
+
   form.addEventListener('submit', async (e) => {
     e.preventDefault();
     const fileInput = document.querySelector('#chatFile');
@@ -182,8 +237,9 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     const file = fileInput.files[0];
-    if (!file.name.toLowerCase().endsWith('.txt')) {
-      showStatus('Please select a .txt file only', 'danger');
+    const fileName = file.name.toLowerCase();
+    if (!['.txt', '.zip', '.gz', '.zst'].some((ext) => fileName.endsWith(ext))) {
+      showStatus('Please select a .txt or .zip file only', 'danger');
       return;
     }
 
@@ -193,17 +249,32 @@ document.addEventListener('DOMContentLoaded', () => {
       submitBtn.disabled = true;
       showStatus('Starting PDF generation...', 'info');
 
-      const formData = new FormData();
-      formData.append('chat', fileInput.files[0]);
+      let upload = file;
+      let uploadName = file.name;
+      if (fileName.endsWith('.txt') && 'CompressionStream' in window) {
+        // Chats compress 5-10x: gzip them in the browser to upload faster
+        upload = await new Response(
+          file.stream().pipeThrough(new CompressionStream('gzip'))
+        ).blob();
+        uploadName = `${file.name}.gz`;
+      }
       const langSelect = document.getElementById('langSelect');
-      formData.append('lang', langSelect.value);
 
-      // console.log('Sending request to:', `${API_URL}/generate`);
-      const response = await fetch(`${API_URL}/generate`, {
-        method: 'POST',
-        body: formData,
-        mode: 'cors'
-      });
+      let response;
+      if (upload.size > CHUNKED_UPLOAD_THRESHOLD) {
+        response = await uploadInChunks(upload, uploadName, langSelect.value);
+      } else {
+        const formData = new FormData();
+        formData.append('chat', upload, uploadName);
+        formData.append('lang', langSelect.value);
+
+        // console.log('Sending request to:', `${API_URL}/generate`);
+        response = await fetch(`${API_URL}/generate`, {
+          method: 'POST',
+          body: formData,
+          mode: 'cors'
+        });
+      }
 
       // console.log('Response received:', response);
       // console.log('Response headers:', [...response.headers.entries()]);
@@ -11,6 +11,7 @@ cd backend
 python -m venv venv
 source venv/bin/activate  # Use 'venv\Scripts\activate' on Windows
 pip install -r requirements.txt
+python -m src.lexicon  # Compile the word lists
 
 # Create necessary directories
 mkdir -p temp pdfs text_files